@@ -8,6 +8,7 @@ from homeassistant.core import HomeAssistant
 
 from .const import DOMAIN
 from .entry_manager import CrownstoneEntryManager
+from .storage import CloudDataStore
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,3 +45,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if len(hass.data[DOMAIN]) == 0:
         hass.data.pop(DOMAIN)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored cloud data when a config entry is removed."""
+    await CloudDataStore(hass, entry.entry_id).async_remove()
@@ -0,0 +1,167 @@
+"""Schedule switch commands that are sent via the Crownstone Cloud."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+import logging
+import random
+import time
+
+import aiohttp
+from crownstone_cloud.exceptions import CrownstoneConnectionError
+
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# errors that are worth another attempt
+TRANSIENT_ERRORS = (
+    CrownstoneConnectionError,
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+)
+
+
+class CloudCommandScheduler:
+    """
+    Send cloud commands with bounded concurrency and a rate limit.
+
+    Every sphere has its own queue, the queues take turns,
+    so a large automation in one sphere does not hold up the others.
+    Commands are rate limited with a token bucket,
+    transient errors are retried with an exponential delay and jitter.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        rate: float,
+        burst: int,
+        retries: int,
+        retry_delay: float,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queues: dict[
+            str,
+            deque[tuple[Callable[[], Awaitable[None]], asyncio.Future[None], float]],
+        ] = {}
+        # spheres with queued commands, in the order they get a turn
+        self._turns: deque[str] = deque()
+        self._workers: set[asyncio.Task[None]] = set()
+        self._tokens = float(burst)
+        self._tokens_updated = time.monotonic()
+        # scheduler statistics
+        self.command_count = 0
+        self.retry_count = 0
+        self.max_queue_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of commands waiting to be sent."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def async_run(
+        self, sphere_id: str, command: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Queue a command for a sphere and wait until it was sent."""
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        if sphere_id not in self._queues:
+            self._queues[sphere_id] = deque()
+            self._turns.append(sphere_id)
+        self._queues[sphere_id].append((command, future, time.monotonic()))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        active_workers = [worker for worker in self._workers if not worker.done()]
+        if len(active_workers) < self.concurrency:
+            worker = asyncio.create_task(self._async_work())
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+
+        await future
+
+    async def _async_work(self) -> None:
+        """Send queued commands, one sphere after the other, until none are left."""
+        while self._turns:
+            sphere_id = self._turns.popleft()
+            queue = self._queues[sphere_id]
+            command, future, queued_at = queue.popleft()
+            if queue:
+                self._turns.append(sphere_id)
+            else:
+                del self._queues[sphere_id]
+
+            # the caller stopped waiting
+            if future.done():
+                continue
+
+            try:
+                await self._async_send(command)
+            except Exception as err:  # pylint: disable=broad-except
+                # raised to the caller of the command
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(None)
+
+            self.command_count += 1
+            self.last_latency = time.monotonic() - queued_at
+            self.max_latency = max(self.max_latency, self.last_latency)
+            _LOGGER.debug(
+                "Cloud command done in %.3f seconds, %s commands queued",
+                self.last_latency,
+                self.queue_depth,
+            )
+
+    async def _async_send(self, command: Callable[[], Awaitable[None]]) -> None:
+        """Send a command, retry on errors that are likely to pass."""
+        for attempt in range(self.retries + 1):
+            await self._async_acquire_token()
+            try:
+                await command()
+            except TRANSIENT_ERRORS:
+                if attempt == self.retries:
+                    raise
+                self.retry_count += 1
+                delay = self.retry_delay * 2**attempt * random.uniform(0.5, 1.5)
+                _LOGGER.debug(
+                    "Cloud command failed, retrying in %.2f seconds (%s/%s)",
+                    delay,
+                    attempt + 1,
+                    self.retries,
+                )
+                await asyncio.sleep(delay)
+            else:
+                return
+
+    async def _async_acquire_token(self) -> None:
+        """Wait until the rate limit allows another request."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._tokens_updated) * self.rate
+            )
+            self._tokens_updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the queued commands and the workers."""
+        for queue in self._queues.values():
+            for _, future, _ in queue:
+                future.cancel()
+        self._queues = {}
+        self._turns.clear()
+        for worker in self._workers:
+            worker.cancel()
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from collections.abc import Callable
-from typing import Any
+from typing import Any, Final
 
 from crownstone_cloud import CrownstoneCloud
 from crownstone_cloud.exceptions import (
@@ -21,14 +21,26 @@ from homeassistant.data_entry_flow import FlowHandler, FlowResult
 from homeassistant.helpers import aiohttp_client
 
 from .const import (
+    CONF_POWER_DEADBAND,
+    CONF_POWER_DEADBAND_PERCENT,
+    CONF_POWER_MAX_INTERVAL,
+    CONF_POWER_MIN_INTERVAL,
+    CONF_UART_FLUSH_INTERVAL,
     CONF_USB_MANUAL_PATH,
     CONF_USB_PATH,
     CONF_USB_SPHERE,
     CONF_USB_SPHERE_OPTION,
     CONF_USE_USB_OPTION,
+    DEFAULT_POWER_DEADBAND,
+    DEFAULT_POWER_DEADBAND_PERCENT,
+    DEFAULT_POWER_MAX_INTERVAL,
+    DEFAULT_POWER_MIN_INTERVAL,
+    DEFAULT_UART_FLUSH_INTERVAL,
     DOMAIN,
     DONT_USE_USB,
     MANUAL_PATH,
+    MAX_UART_FLUSH_INTERVAL,
+    MIN_UART_FLUSH_INTERVAL,
     REFRESH_LIST,
 )
 from .helpers import list_ports_as_str
@@ -36,6 +48,33 @@ from .helpers import list_ports_as_str
 CONFIG_FLOW = "config_flow"
 OPTIONS_FLOW = "options_flow"
 
+# options that are only available when a USB dongle is configured
+USB_OPTIONS: Final[dict[str, tuple[int, vol.All]]] = {
+    CONF_UART_FLUSH_INTERVAL: (
+        DEFAULT_UART_FLUSH_INTERVAL,
+        vol.All(
+            vol.Coerce(int),
+            vol.Range(min=MIN_UART_FLUSH_INTERVAL, max=MAX_UART_FLUSH_INTERVAL),
+        ),
+    ),
+    CONF_POWER_DEADBAND: (
+        DEFAULT_POWER_DEADBAND,
+        vol.All(vol.Coerce(int), vol.Range(min=0)),
+    ),
+    CONF_POWER_DEADBAND_PERCENT: (
+        DEFAULT_POWER_DEADBAND_PERCENT,
+        vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+    ),
+    CONF_POWER_MIN_INTERVAL: (
+        DEFAULT_POWER_MIN_INTERVAL,
+        vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+    ),
+    CONF_POWER_MAX_INTERVAL: (
+        DEFAULT_POWER_MAX_INTERVAL,
+        vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+    ),
+}
+
 
 class BaseCrownstoneFlowHandler(FlowHandler):
     """Represent the base flow for Crownstone."""
@@ -238,8 +277,21 @@ class CrownstoneOptionsFlowHandler(BaseCrownstoneFlowHandler, OptionsFlow):
                     ): vol.In(spheres.keys())
                 }
             )
+        if usb_path is not None:
+            options_schema = options_schema.extend(
+                {
+                    vol.Optional(
+                        option, default=self.entry.options.get(option, default)
+                    ): validator
+                    for option, (default, validator) in USB_OPTIONS.items()
+                }
+            )
 
         if user_input is not None:
+            for option in USB_OPTIONS:
+                if option in user_input:
+                    self.updated_options[option] = user_input[option]
+
             if user_input[CONF_USE_USB_OPTION] and usb_path is None:
                 return await self.async_step_usb_config()
             if not user_input[CONF_USE_USB_OPTION] and usb_path is not None:
@@ -10,6 +10,9 @@ DOMAIN: Final = "crownstone"
 PROJECT_NAME: Final = "home-assistant-hacs"
 PLATFORMS: Final[list[Platform]] = [Platform.LIGHT, Platform.SENSOR]
 
+# Integration data shared by the config entries
+DATA_TRIGGER_ROUTER: Final = "crownstone_trigger_router"
+
 # Listeners
 SSE_LISTENERS: Final = "sse_listeners"
 UART_LISTENERS: Final = "uart_listeners"
@@ -26,15 +29,30 @@ POWER_USAGE_NAME_SUFFIX: Final = "Power"
 ENERGY_USAGE_NAME_SUFFIX: Final = "Energy"
 CONNECTION_NAME_SUFFIX: Final = "Connection"
 
+# SSE health sensors, unique ID suffix and name
+SSE_HEALTH_SENSORS: Final[dict[str, str]] = {
+    "sse_reconnects": "Crownstone SSE reconnects",
+    "sse_last_event_age": "Crownstone SSE last event age",
+    "sse_downtime": "Crownstone SSE downtime",
+}
+
 # Signals (within integration)
-SIG_CROWNSTONE_STATE_UPDATE: Final = "crownstone.crownstone_state_update"
 SIG_PRESENCE_STATE_UPDATE: Final = "crownstone.presence_state_update"
-SIG_POWER_STATE_UPDATE: Final = "crownstone.power_state_update"
-SIG_ENERGY_STATE_UPDATE: Final = "crownstone.energy_state_update"
 SIG_UART_STATE_CHANGE: Final = "crownstone.uart_state_change"
 SIG_SSE_STATE_CHANGE: Final = "crownstone.sse_state_change"
 SIG_ADD_CROWNSTONE_DEVICES: Final = "crownstone.add_crownstone_device"
 SIG_ADD_PRESENCE_DEVICES: Final = "crownstone.add_presence_device"
+SIG_ADD_SPHERE_DEVICES: Final = "crownstone.add_sphere_device"
+# Signals for a single Crownstone, formatted with the cloud id
+SIG_CROWNSTONE_STATE_UPDATE: Final = "crownstone.crownstone_state_update_{}"
+SIG_POWER_STATE_UPDATE: Final = "crownstone.power_state_update_{}"
+SIG_ENERGY_STATE_UPDATE: Final = "crownstone.energy_state_update_{}"
+# Signal for the presence in a sphere or location, formatted with its cloud id
+SIG_PRESENCE_UPDATE: Final = "crownstone.presence_update_{}"
+# Signal for the users of a sphere, formatted with the sphere id
+SIG_USER_DATA_UPDATE: Final = "crownstone.user_data_update_{}"
+# Signal for a config entry when its USB dongle is set up, formatted with the entry id
+SIG_USB_SETUP_DONE: Final = "crownstone.usb_setup_done_{}"
 
 # Abilities
 ABILITY: Final[dict[str, Any]] = {"enabled": False, "properties": {}}
@@ -49,11 +67,77 @@ CONF_USB_SPHERE: Final = "usb_sphere"
 # Options flow
 CONF_USE_USB_OPTION: Final = "use_usb_option"
 CONF_USB_SPHERE_OPTION: Final = "usb_sphere_option"
+CONF_UART_FLUSH_INTERVAL: Final = "uart_flush_interval"
+CONF_POWER_DEADBAND: Final = "power_deadband"
+CONF_POWER_DEADBAND_PERCENT: Final = "power_deadband_percent"
+CONF_POWER_MIN_INTERVAL: Final = "power_min_interval"
+CONF_POWER_MAX_INTERVAL: Final = "power_max_interval"
 # USB config list entries
 DONT_USE_USB: Final = "Don't use USB"
 REFRESH_LIST: Final = "Refresh list"
 MANUAL_PATH: Final = "Enter manually"
 
+# Cloud sync retry delay after startup from a snapshot (seconds)
+CLOUD_SYNC_RETRY_DELAY: Final = 10
+MAX_CLOUD_SYNC_RETRY_DELAY: Final = 300
+# Data change events within this window (seconds) are handled in one refresh
+DATA_CHANGE_DEBOUNCE: Final = 1.0
+
+# SSE stream supervision (seconds), the server sends a ping every 30 seconds
+SSE_HEARTBEAT_TIMEOUT: Final = 90
+SSE_RECONNECT_DELAY: Final = 5
+MAX_SSE_RECONNECT_DELAY: Final = 300
+# SSE events waiting to be handled, per lane, the oldest is dropped when full
+SSE_INTERACTIVE_QUEUE_SIZE: Final = 1000
+SSE_DATA_QUEUE_SIZE: Final = 200
+# SSE events handled before the event loop gets a turn
+SSE_QUEUE_BATCH_SIZE: Final = 50
+
+# Switch commands within this window (seconds) are sent in one multi switch packet
+MESH_SWITCH_BATCH_WINDOW: Final = 0.02
+# Crownstones per multi switch packet, larger batches are split
+MULTI_SWITCH_MAX_ITEMS: Final = 20
+
+# Cloud command scheduling
+CLOUD_COMMAND_CONCURRENCY: Final = 4
+CLOUD_COMMAND_RATE: Final = 5  # requests per second
+CLOUD_COMMAND_BURST: Final = 10
+CLOUD_COMMAND_RETRIES: Final = 2
+CLOUD_COMMAND_RETRY_DELAY: Final = 1  # seconds
+
+# Switch command confirmation
+PENDING_COMMAND_TIMEOUT: Final = 15  # seconds
+PENDING_COMMAND_RETRIES: Final = 1
+CONFIRMATION_LATENCY_BUCKETS: Final[tuple[float, ...]] = (
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+
+# Presence event filtering (seconds)
+PRESENCE_DEDUPE_WINDOW: Final = 10
+PRESENCE_HYSTERESIS: Final = 5
+
+# Services
+SERVICE_MULTI_SWITCH: Final = "multi_switch"
+ATTR_SWITCH_ON: Final = "switch_on"
+
+# UART update batching (milliseconds)
+DEFAULT_UART_FLUSH_INTERVAL: Final = 100
+MIN_UART_FLUSH_INTERVAL: Final = 10
+MAX_UART_FLUSH_INTERVAL: Final = 1000
+
+# Power usage state writes
+DEFAULT_POWER_DEADBAND: Final = 2  # W
+DEFAULT_POWER_DEADBAND_PERCENT: Final = 0  # %
+DEFAULT_POWER_MIN_INTERVAL: Final = 0  # seconds
+DEFAULT_POWER_MAX_INTERVAL: Final = 300  # seconds
+
 # Crownstone entity
 CROWNSTONE_INCLUDE_TYPES: Final[dict[str, str]] = {
     "PLUG": "Plug",
@@ -69,6 +153,8 @@ PRESENCE_LOCATION_ICON: Final = "mdi:map-marker-radius"
 
 # Energy usage constant
 JOULE_TO_KWH: Final = 3600000
+# States written before the energy accumulator are rounded to 0.01 kWh (joule)
+LEGACY_ENERGY_PRECISION: Final = 36000
 
 # Device automation
 
@@ -0,0 +1,101 @@
+"""Coalesce bursts of Crownstone SSE data change events."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from functools import partial
+import logging
+
+import aiohttp
+from crownstone_cloud.exceptions import (
+    CrownstoneConnectionError,
+    CrownstoneUnknownError,
+)
+from crownstone_sse.events import DataChangeEvent
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DataChangeQueue:
+    """
+    Queue data change events per sphere and sub type.
+
+    Events that arrive within the debounce window are handled in one refresh.
+    Refreshes run one at a time, so every refresh starts from consistent data.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        debounce: float,
+        refresh_callback: Callable[[list[DataChangeEvent]], Awaitable[None]],
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self.debounce = debounce
+        self.refresh_callback = refresh_callback
+        self._lock = asyncio.Lock()
+        self._pending: dict[tuple[str, str], list[DataChangeEvent]] = {}
+        self._timers: dict[tuple[str, str], CALLBACK_TYPE] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        # queue statistics
+        self.event_count = 0
+        self.refresh_count = 0
+
+    @callback
+    def async_add(self, data_change_event: DataChangeEvent) -> None:
+        """Add an event, a refresh is scheduled for the first event of a window."""
+        self.event_count += 1
+        key = (data_change_event.sphere_id, data_change_event.sub_type)
+        self._pending.setdefault(key, []).append(data_change_event)
+        if key in self._timers:
+            return
+
+        # a callback job, so the flush runs in the event loop
+        self._timers[key] = async_call_later(
+            self.hass, self.debounce, callback(partial(self._async_flush, key))
+        )
+
+    @callback
+    def _async_flush(self, key: tuple[str, str], _: datetime) -> None:
+        """Start a refresh for the events of a sphere and sub type."""
+        self._timers.pop(key, None)
+        events = self._pending.pop(key, [])
+        if not events:
+            return
+
+        task = asyncio.create_task(self._async_refresh(events))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_refresh(self, events: list[DataChangeEvent]) -> None:
+        """Wait for the previous refresh to finish, then refresh the data."""
+        async with self._lock:
+            self.refresh_count += 1
+            try:
+                await self.refresh_callback(events)
+            except (
+                CrownstoneConnectionError,
+                CrownstoneUnknownError,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+            ) as err:
+                _LOGGER.warning(
+                    "Could not update Crownstone data after %s data change events: %s",
+                    len(events),
+                    err,
+                )
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel scheduled and running refreshes."""
+        for cancel_timer in self._timers.values():
+            cancel_timer()
+        self._timers = {}
+        self._pending = {}
+        for task in self._tasks:
+            task.cancel()
@@ -38,9 +38,8 @@ from .const import (
     DOMAIN,
     PRESENCE_LOCATION,
     PRESENCE_SPHERE,
-    PRESENCE_SUFFIX,
 )
-from .entry_manager import CrownstoneEntryManager
+from .helpers import async_get_presence_entity
 
 SUPPORTED_DEVICES: Final[set[str]] = {PRESENCE_LOCATION, PRESENCE_SPHERE}
 
@@ -59,34 +58,6 @@ CONDITION_SCHEMA = DEVICE_CONDITION_BASE_SCHEMA.extend(
 )
 
 
-@callback
-def _async_get_condition_data(
-    hass: HomeAssistant, entity_id: str
-) -> dict[str, str] | None:
-    """Get the Crownstone users for the sphere."""
-    crownstone_users: dict[str, str] = {}
-
-    registry = entity_registry.async_get(hass)
-    entity = registry.async_get(entity_id)
-    if entity is None:
-        return None
-
-    crownstone_device_id = entity.unique_id[: -(len(PRESENCE_SUFFIX) + 1)]
-    manager: CrownstoneEntryManager = hass.data[DOMAIN][entity.config_entry_id]
-
-    for sphere in manager.cloud.cloud_data:
-        if (
-            sphere.cloud_id == crownstone_device_id
-            or crownstone_device_id in sphere.locations.data
-        ):
-            crownstone_users = {
-                f"{user.first_name} {user.last_name}": f"{user.first_name} {user.last_name}"
-                for user in sphere.users
-            }
-
-    return crownstone_users
-
-
 @callback
 def _async_get_state(hass: HomeAssistant, entity_id: str) -> State:
     """Get the state for an entity id. Raise error if it returns None."""
@@ -159,16 +130,21 @@ async def async_get_condition_capabilities(
     hass: HomeAssistant, config: ConfigType
 ) -> dict[str, vol.Schema]:
     """List condition capabilities."""
-    condition_data = _async_get_condition_data(hass, config[CONF_ENTITY_ID])
-    if condition_data is None:
+    presence_entity = async_get_presence_entity(hass, config[CONF_ENTITY_ID])
+    if presence_entity is None:
         raise HomeAssistantError(
             f"Could not get condition data for entity {config[CONF_ENTITY_ID]}"
         )
+    _, condition_data = presence_entity
 
     if config[CONF_TYPE] in (CONF_USERS_PRESENT, CONF_USERS_NOT_PRESENT):
         return {
             "extra_fields": vol.Schema(
-                {vol.Required(CONF_USERS): cv.multi_select(condition_data)}
+                {
+                    vol.Required(CONF_USERS): cv.multi_select(
+                        {user: user for user in condition_data.users}
+                    )
+                }
             )
         }
 
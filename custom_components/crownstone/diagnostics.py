@@ -0,0 +1,66 @@
+"""Diagnostics support for Crownstone."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .entry_manager import CrownstoneEntryManager
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    manager: CrownstoneEntryManager = hass.data[DOMAIN][entry.entry_id]
+
+    diagnostics: dict[str, Any] = {
+        "setup_timings": manager.setup_timings,
+        "cloud_ready": manager.cloud_ready,
+        "switch_confirmations": manager.pending_commands.as_dict(),
+        "presence_events": manager.presence_filter.as_dict(),
+        "presence_triggers": {
+            **manager.trigger_router.as_dict(),
+            "entity_map_builds": manager.presence_entities.build_count,
+        },
+        "cloud_commands": {
+            "commands": manager.cloud_scheduler.command_count,
+            "retries": manager.cloud_scheduler.retry_count,
+            "queue_depth": manager.cloud_scheduler.queue_depth,
+            "max_queue_depth": manager.cloud_scheduler.max_queue_depth,
+            "last_latency": manager.cloud_scheduler.last_latency,
+            "max_latency": manager.cloud_scheduler.max_latency,
+        },
+    }
+    if manager.sse is not None:
+        diagnostics["sse"] = manager.sse.as_dict()
+        diagnostics["sse_events"] = {
+            **manager.event_queue.as_dict(),
+            "unrouted": manager.unrouted_event_count,
+        }
+    if manager.data_change_queue is not None:
+        diagnostics["data_changes"] = {
+            "events": manager.data_change_queue.event_count,
+            "refreshes": manager.data_change_queue.refresh_count,
+        }
+    if manager.mesh_switch is not None:
+        diagnostics["usb_commands"] = {
+            "packets": manager.mesh_switch.packet_count,
+            "commands": manager.mesh_switch.command_count,
+            "last_latency": manager.mesh_switch.last_latency,
+            "average_latency": manager.mesh_switch.average_latency,
+            "max_latency": manager.mesh_switch.max_latency,
+        }
+    if manager.uart_bridge is not None:
+        diagnostics["usb_updates"] = {
+            "batches": manager.uart_bridge.batch_count,
+            "updates": manager.uart_bridge.update_count,
+            "last_batch_size": manager.uart_bridge.last_batch_size,
+            "max_batch_size": manager.uart_bridge.max_batch_size,
+            "uid_index_hits": manager.uid_index.hits,
+            "uid_index_misses": manager.uid_index.misses,
+        }
+
+    return diagnostics
@@ -2,48 +2,118 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
 import logging
-from typing import Any
+import time
+from typing import Any, TypeVar
 
+import aiohttp
 from crownstone_cloud import CrownstoneCloud
+from crownstone_cloud.cloud_models.crownstones import Crownstone
+from crownstone_cloud.cloud_models.locations import Location
+from crownstone_cloud.cloud_models.spheres import Sphere
 from crownstone_cloud.exceptions import (
     CrownstoneAuthenticationError,
+    CrownstoneConnectionError,
     CrownstoneUnknownError,
 )
 from crownstone_sse import CrownstoneSSEAsync
-from crownstone_sse.const import EVENT_PRESENCE
+from crownstone_sse.events import Event as SSEEvent, PresenceEvent
 from crownstone_uart import CrownstoneUart, UartEventBus
 from crownstone_uart.Exceptions import UartException
 
 from homeassistant.components import persistent_notification
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, EVENT_HOMEASSISTANT_STOP
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import aiohttp_client
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
 
+from .cloud_scheduler import CloudCommandScheduler
 from .const import (
+    CLOUD_COMMAND_BURST,
+    CLOUD_COMMAND_CONCURRENCY,
+    CLOUD_COMMAND_RATE,
+    CLOUD_COMMAND_RETRIES,
+    CLOUD_COMMAND_RETRY_DELAY,
+    CLOUD_SYNC_RETRY_DELAY,
+    CONF_UART_FLUSH_INTERVAL,
     CONF_USB_PATH,
     CONF_USB_SPHERE,
+    DATA_CHANGE_DEBOUNCE,
+    DEFAULT_UART_FLUSH_INTERVAL,
     DOMAIN,
+    MAX_CLOUD_SYNC_RETRY_DELAY,
+    MAX_SSE_RECONNECT_DELAY,
+    MESH_SWITCH_BATCH_WINDOW,
+    PENDING_COMMAND_RETRIES,
+    PENDING_COMMAND_TIMEOUT,
     PLATFORMS,
+    PRESENCE_DEDUPE_WINDOW,
+    PRESENCE_HYSTERESIS,
     PROJECT_NAME,
+    SIG_ADD_CROWNSTONE_DEVICES,
+    SIG_ADD_PRESENCE_DEVICES,
+    SIG_ADD_SPHERE_DEVICES,
+    SIG_CROWNSTONE_STATE_UPDATE,
+    SIG_PRESENCE_STATE_UPDATE,
+    SIG_USB_SETUP_DONE,
+    SIG_USER_DATA_UPDATE,
+    SSE_DATA_QUEUE_SIZE,
+    SSE_HEARTBEAT_TIMEOUT,
+    SSE_INTERACTIVE_QUEUE_SIZE,
     SSE_LISTENERS,
+    SSE_QUEUE_BATCH_SIZE,
+    SSE_RECONNECT_DELAY,
     UART_LISTENERS,
 )
-from .helpers import get_port
-from .listeners import setup_sse_listeners, setup_uart_listeners
+from .data_change_queue import DataChangeQueue
+from .event_queue import SSEEventQueue
+from .helpers import (
+    CrownstoneUidIndex,
+    PresenceEntityMap,
+    PresenceIndex,
+    async_remove_devices,
+    async_update_devices,
+    get_added_items,
+    get_port,
+    get_removed_items,
+)
+from .listeners import (
+    async_update_crwn_state_uart,
+    async_update_data,
+    async_update_presence,
+    setup_sse_listeners,
+    setup_uart_listeners,
+)
+from .mesh_switch import MeshSwitchBatcher
+from .pending_commands import PendingCommandTable
+from .presence_filter import PresenceEventFilter
+from .sse_supervisor import SSESupervisor
+from .storage import CloudDataStore
+from .trigger_router import async_get_trigger_router
+from .uart_bridge import UartUpdateBridge
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 
 class CrownstoneEntryManager:
     """Manage a Crownstone config entry."""
 
     uart: CrownstoneUart | None = None
+    uart_bridge: UartUpdateBridge | None = None
+    data_change_queue: DataChangeQueue | None = None
+    mesh_switch: MeshSwitchBatcher | None = None
     cloud: CrownstoneCloud
-    sse: CrownstoneSSEAsync
+    sse: SSESupervisor | None = None
+    store: CloudDataStore
+    cloud_sync_task: asyncio.Task[None] | None = None
+    usb_setup_done = False
 
     def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
         """Initialize the hub."""
@@ -51,6 +121,47 @@ class CrownstoneEntryManager:
         self.config_entry = config_entry
         self.listeners: dict[str, Any] = {}
         self.usb_sphere_id: str | None = None
+        self.uid_index = CrownstoneUidIndex()
+        self.presence_index = PresenceIndex()
+        # presence entities resolved for device automations
+        self.presence_entities = PresenceEntityMap(hass, config_entry.entry_id)
+        # presence events are filtered before they reach the event bus
+        self.presence_filter = PresenceEventFilter(
+            hass,
+            self.presence_index,
+            PRESENCE_DEDUPE_WINDOW,
+            PRESENCE_HYSTERESIS,
+            self._async_publish_presence,
+        )
+        # switch commands that can't use the USB dongle
+        self.pending_commands = PendingCommandTable(
+            hass, PENDING_COMMAND_TIMEOUT, PENDING_COMMAND_RETRIES
+        )
+        self.cloud_scheduler = CloudCommandScheduler(
+            CLOUD_COMMAND_CONCURRENCY,
+            CLOUD_COMMAND_RATE,
+            CLOUD_COMMAND_BURST,
+            CLOUD_COMMAND_RETRIES,
+            CLOUD_COMMAND_RETRY_DELAY,
+        )
+        # handlers of SSE events per type and sub type, a sub type of None for all
+        self.event_handlers: dict[
+            tuple[str, str | None], list[Callable[[Any], None]]
+        ] = {}
+        self.unrouted_event_count = 0
+        # presence events are passed to device triggers directly, the router is
+        # shared by the entries so triggers stay attached when an entry reloads
+        self.trigger_router = async_get_trigger_router(hass)
+        # events from the stream are handled in order of priority
+        self.event_queue = SSEEventQueue(
+            self._async_route_event,
+            SSE_INTERACTIVE_QUEUE_SIZE,
+            SSE_DATA_QUEUE_SIZE,
+            SSE_QUEUE_BATCH_SIZE,
+        )
+        # logged in to the cloud, when starting from a snapshot this happens later
+        self.cloud_ready = False
+        self.setup_timings: dict[str, float] = {}
 
     async def async_setup(self) -> bool:
         """
@@ -58,51 +169,78 @@ class CrownstoneEntryManager:
 
         Returns True if the setup was successful.
         """
-        email = self.config_entry.data[CONF_EMAIL]
-        password = self.config_entry.data[CONF_PASSWORD]
-
         self.cloud = CrownstoneCloud(
-            email=email,
-            password=password,
+            email=self.config_entry.data[CONF_EMAIL],
+            password=self.config_entry.data[CONF_PASSWORD],
             clientsession=aiohttp_client.async_get_clientsession(self.hass),
         )
-        # Login & sync all user data
-        try:
-            await self.cloud.async_initialize()
-        except CrownstoneAuthenticationError as auth_err:
-            _LOGGER.error(
-                "Auth error during login with type: %s and message: %s",
-                auth_err.type,
-                auth_err.message,
-            )
-            return False
-        except CrownstoneUnknownError as unknown_err:
-            _LOGGER.error("Unknown error during login")
-            raise ConfigEntryNotReady from unknown_err
+        self.store = CloudDataStore(self.hass, self.config_entry.entry_id)
 
-        # A new clientsession is created because the default one does not cleanup on unload
-        self.sse = CrownstoneSSEAsync(
-            email=email,
-            password=password,
-            access_token=self.cloud.access_token,
-            websession=aiohttp_client.async_create_clientsession(self.hass),
-            project_name=PROJECT_NAME,
+        # Load the cloud data of the previous run, it is synced in the background
+        # Devices are known without the cloud, so the USB dongle can be used offline
+        snapshot_loaded = await self._async_timed_stage(
+            "snapshot", self.store.async_load(self.cloud)
         )
-        # Listen for events in the background, without task tracking
-        asyncio.create_task(self.async_process_events(self.sse))
-        setup_sse_listeners(self)
+        if not snapshot_loaded:
+            # Login & sync all user data
+            try:
+                await self._async_timed_stage("cloud", self.cloud.async_initialize())
+            except CrownstoneAuthenticationError as auth_err:
+                _LOGGER.error(
+                    "Auth error during login with type: %s and message: %s",
+                    auth_err.type,
+                    auth_err.message,
+                )
+                return False
+            except CrownstoneUnknownError as unknown_err:
+                _LOGGER.error("Unknown error during login")
+                raise ConfigEntryNotReady from unknown_err
+            except (
+                CrownstoneConnectionError,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+            ) as connection_err:
+                # without a snapshot there are no devices to use offline
+                raise ConfigEntryNotReady from connection_err
 
-        # Set up a Crownstone USB only if path exists
-        if self.config_entry.options[CONF_USB_PATH] is not None:
-            await self.async_setup_usb()
+            self.cloud_ready = True
+            self.store.async_delay_save(self.cloud)
+            self.async_setup_sse()
+
+        self.presence_index.build(self.cloud.cloud_data)
+
+        # Bursts of data change events are handled in a single refresh
+        self.data_change_queue = DataChangeQueue(
+            self.hass, DATA_CHANGE_DEBOUNCE, partial(async_update_data, self)
+        )
+        setup_sse_listeners(self)
 
         # Save the sphere where the USB is located
         # Makes HA aware of the Crownstone environment HA is placed in, a user can have multiple
         self.usb_sphere_id = self.config_entry.options[CONF_USB_SPHERE]
 
-        await self.hass.config_entries.async_forward_entry_setups(
-            self.config_entry, PLATFORMS
-        )
+        # Opening the serial port and setting up the platforms are independent,
+        # entities use the USB dongle as soon as it is ready
+        # Entities that only work with the USB dongle are added when it is set up
+        stages = [
+            self._async_timed_stage(
+                "platforms",
+                self.hass.config_entries.async_forward_entry_setups(
+                    self.config_entry, PLATFORMS
+                ),
+            )
+        ]
+        # Set up a Crownstone USB only if path exists
+        if self.config_entry.options[CONF_USB_PATH] is not None:
+            self.uart = CrownstoneUart()
+            stages.append(self._async_timed_stage("usb", self.async_setup_usb()))
+
+        await asyncio.gather(*stages)
+        if self.uart is not None:
+            self.usb_setup_done = True
+            async_dispatcher_send(
+                self.hass, SIG_USB_SETUP_DONE.format(self.config_entry.entry_id)
+            )
 
         # HA specific listeners
         self.config_entry.async_on_unload(
@@ -111,37 +249,321 @@ class CrownstoneEntryManager:
         self.config_entry.async_on_unload(
             self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self.on_shutdown)
         )
+        # entity ids of presence entities can be changed by the user
+        self.config_entry.async_on_unload(
+            self.hass.bus.async_listen(
+                EVENT_ENTITY_REGISTRY_UPDATED,
+                self.presence_entities.async_entity_registry_updated,
+            )
+        )
+
+        if snapshot_loaded:
+            # not a hass task, it should not delay the startup of Home Assistant
+            self.cloud_sync_task = asyncio.create_task(self.async_sync_cloud_data())
 
+        _LOGGER.debug(
+            "Crownstone setup stage durations (seconds): %s", self.setup_timings
+        )
         return True
 
-    async def async_process_events(self, sse_client: CrownstoneSSEAsync) -> None:
-        """Asynchronous iteration of Crownstone SSE events."""
-        async with sse_client as client:
-            async for event in client:
-                if event is not None:
-                    # presence event is used for device automation
-                    if event.type == EVENT_PRESENCE:
-                        self.hass.bus.async_fire(f"{DOMAIN}_{event.type}", event.data)
-                    else:
-                        async_dispatcher_send(
-                            self.hass, f"{DOMAIN}_{event.type}", event
-                        )
+    async def _async_timed_stage(self, stage: str, awaitable: Awaitable[_T]) -> _T:
+        """Await a setup stage and record how long it took."""
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.setup_timings[stage] = round(time.monotonic() - start, 3)
+
+    @callback
+    def async_setup_sse(self) -> None:
+        """Connect to the Crownstone SSE server, after a login to the cloud."""
+        # A new clientsession is created because the default one does not cleanup on unload
+        # It is shared by the clients that are created when reconnecting
+        websession = aiohttp_client.async_create_clientsession(self.hass)
+        self.sse = SSESupervisor(
+            self.hass,
+            partial(self._create_sse_client, websession),
+            self._async_receive_event,
+            SSE_HEARTBEAT_TIMEOUT,
+            SSE_RECONNECT_DELAY,
+            MAX_SSE_RECONNECT_DELAY,
+        )
+        self.sse.async_start()
+
+    def _create_sse_client(
+        self, websession: aiohttp.ClientSession
+    ) -> CrownstoneSSEAsync:
+        """Create an SSE client with the current access token of the cloud."""
+        return CrownstoneSSEAsync(
+            email=self.config_entry.data[CONF_EMAIL],
+            password=self.config_entry.data[CONF_PASSWORD],
+            access_token=self.cloud.access_token,
+            websession=websession,
+            project_name=PROJECT_NAME,
+        )
+
+    async def async_sync_cloud_data(self) -> None:
+        """
+        Login and sync the cloud data that was loaded from the snapshot.
+
+        Retries until the cloud is reachable, then applies the differences.
+        """
+        retry_delay = CLOUD_SYNC_RETRY_DELAY
+        while True:
+            # existing objects are updated in place by the cloud library
+            old_spheres = self.cloud.cloud_data.data.copy()
+            old_data = {
+                sphere.cloud_id: (
+                    sphere.crownstones.data.copy(),
+                    sphere.locations.data.copy(),
+                    {
+                        crownstone.cloud_id: crownstone.state
+                        for crownstone in sphere.crownstones
+                    },
+                )
+                for sphere in self.cloud.cloud_data
+            }
+            try:
+                login_response = await self.cloud.request_handler.request_login(
+                    self.cloud.login_data
+                )
+                self.cloud.access_token = login_response["id"]
+                self.cloud_ready = True
+                await self.cloud.async_synchronize()
+            except CrownstoneAuthenticationError as auth_err:
+                _LOGGER.error(
+                    "Auth error during login with type: %s and message: %s",
+                    auth_err.type,
+                    auth_err.message,
+                )
+                self.cloud_ready = False
+                # a setup without snapshot fails in this case, don't keep a
+                # half working entry that can't switch via the cloud
+                persistent_notification.async_create(
+                    self.hass,
+                    "Login to the Crownstone Cloud failed, the Crownstone integration "
+                    "was stopped.\nPlease check the email and password of your "
+                    "Crownstone account and set up the integration again.",
+                    "Crownstone",
+                    "crownstone_cloud_login",
+                )
+                # unloading cancels the sync task, it runs in a task of its own
+                self.cloud_sync_task = None
+                self.hass.async_create_task(
+                    self.hass.config_entries.async_unload(self.config_entry.entry_id)
+                )
+                return
+            except (
+                CrownstoneUnknownError,
+                CrownstoneConnectionError,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+            ):
+                _LOGGER.warning(
+                    "Unable to sync with the Crownstone Cloud, retrying in %s seconds",
+                    retry_delay,
+                )
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_CLOUD_SYNC_RETRY_DELAY)
+                continue
+
+            break
+
+        _LOGGER.debug("Crownstone cloud data synced with the stored snapshot")
+        self.async_apply_cloud_data_changes(old_data)
+        async_update_devices(self.hass, self.cloud.cloud_data.data)
+        self.async_add_spheres(get_added_items(old_spheres, self.cloud.cloud_data.data))
+        self.async_remove_spheres(
+            get_removed_items(old_spheres, self.cloud.cloud_data.data)
+        )
+        self.store.async_delay_save(self.cloud)
+        self.async_setup_sse()
+
+    @callback
+    def async_apply_cloud_data_changes(
+        self,
+        old_data: dict[
+            str, tuple[dict[str, Crownstone], dict[str, Location], dict[str, int]]
+        ],
+    ) -> None:
+        """Apply the differences between the snapshot and the synced cloud data."""
+        for sphere in self.cloud.cloud_data:
+            if sphere.cloud_id not in old_data:
+                continue
+            old_crownstones, old_locations, old_states = old_data[sphere.cloud_id]
+
+            added_crownstones = get_added_items(
+                old_crownstones, sphere.crownstones.data
+            )
+            removed_crownstones = get_removed_items(
+                old_crownstones, sphere.crownstones.data
+            )
+            if sphere.cloud_id == self.usb_sphere_id:
+                self.uid_index.add(added_crownstones)
+                self.uid_index.remove(removed_crownstones)
+            async_update_devices(self.hass, sphere.crownstones.data)
+            async_dispatcher_send(
+                self.hass,
+                SIG_ADD_CROWNSTONE_DEVICES,
+                added_crownstones,
+                sphere.cloud_id,
+            )
+            async_remove_devices(
+                self.hass, self.config_entry.entry_id, removed_crownstones
+            )
+
+            for crownstone in sphere.crownstones:
+                if (
+                    old_states.get(crownstone.cloud_id, crownstone.state)
+                    != crownstone.state
+                ):
+                    async_dispatcher_send(
+                        self.hass,
+                        SIG_CROWNSTONE_STATE_UPDATE.format(crownstone.cloud_id),
+                    )
+
+            async_update_devices(self.hass, sphere.locations.data)
+            async_dispatcher_send(
+                self.hass,
+                SIG_ADD_PRESENCE_DEVICES,
+                get_added_items(old_locations, sphere.locations.data),
+                sphere.cloud_id,
+            )
+            async_remove_devices(
+                self.hass,
+                self.config_entry.entry_id,
+                get_removed_items(old_locations, sphere.locations.data),
+            )
+
+        # users and presence are replaced with the current data from the cloud
+        self.presence_index.build(self.cloud.cloud_data)
+        self.presence_entities.invalidate()
+        self.presence_filter.async_reset()
+        for sphere in self.cloud.cloud_data:
+            async_dispatcher_send(
+                self.hass, SIG_USER_DATA_UPDATE.format(sphere.cloud_id)
+            )
+        async_dispatcher_send(self.hass, SIG_PRESENCE_STATE_UPDATE)
+
+    @callback
+    def async_add_spheres(self, spheres: list[Sphere]) -> None:
+        """Add the devices of new spheres, the IO connections keep running."""
+        for sphere in spheres:
+            if sphere.cloud_id == self.usb_sphere_id:
+                self.uid_index.add(list(sphere.crownstones))
+            async_dispatcher_send(self.hass, SIG_ADD_SPHERE_DEVICES, [sphere])
+            async_dispatcher_send(
+                self.hass,
+                SIG_ADD_CROWNSTONE_DEVICES,
+                list(sphere.crownstones),
+                sphere.cloud_id,
+            )
+            async_dispatcher_send(
+                self.hass,
+                SIG_ADD_PRESENCE_DEVICES,
+                list(sphere.locations),
+                sphere.cloud_id,
+            )
+
+    @callback
+    def async_remove_spheres(self, spheres: list[Sphere]) -> None:
+        """Remove the devices of spheres that were removed from the cloud."""
+        for sphere in spheres:
+            if sphere.cloud_id == self.usb_sphere_id:
+                self.uid_index.remove(list(sphere.crownstones))
+            async_remove_devices(
+                self.hass,
+                self.config_entry.entry_id,
+                [sphere, *sphere.crownstones, *sphere.locations],
+            )
+
+    @callback
+    def async_subscribe_event(
+        self,
+        handler: Callable[[Any], None],
+        event_type: str,
+        sub_type: str | None = None,
+    ) -> CALLBACK_TYPE:
+        """Route SSE events of a type, and optionally a sub type, to a handler."""
+        key = (event_type, sub_type)
+        handlers = self.event_handlers.setdefault(key, [])
+        handlers.append(handler)
+
+        @callback
+        def async_unsubscribe() -> None:
+            """Stop routing the events to the handler."""
+            handlers.remove(handler)
+            if not handlers and self.event_handlers.get(key) is handlers:
+                del self.event_handlers[key]
+
+        return async_unsubscribe
+
+    @callback
+    def _async_receive_event(self, event: SSEEvent) -> None:
+        """Queue an SSE event, events without handlers are dropped right away."""
+        event_type = event.data["type"]
+        if (event_type, None) not in self.event_handlers and (
+            event_type,
+            event.data.get("subType"),
+        ) not in self.event_handlers:
+            self.unrouted_event_count += 1
+            return
+        self.event_queue.async_put(event)
+
+    @callback
+    def _async_route_event(self, event: SSEEvent) -> None:
+        """Pass an SSE event to the handlers of its type and sub type."""
+        event_type = event.data["type"]
+        for handler in (
+            *self.event_handlers.get((event_type, None), ()),
+            *self.event_handlers.get((event_type, event.data.get("subType")), ()),
+        ):
+            handler(event)
+
+    @callback
+    def _async_publish_presence(self, event_data: dict[str, Any]) -> None:
+        """Update the presence with an event that passed the filter."""
+        async_update_presence(self, PresenceEvent(event_data))
+        # device triggers see the updated presence in their conditions
+        self.trigger_router.async_process(event_data)
 
     async def async_setup_usb(self) -> None:
         """Attempt setup of a Crownstone usb dongle."""
+        assert self.uart is not None
         # Trace by-id symlink back to the serial port
         serial_port = await self.hass.async_add_executor_job(
             get_port, self.config_entry.options[CONF_USB_PATH]
         )
         if serial_port is None:
+            self.uart = None
             return
 
-        self.uart = CrownstoneUart()
+        # UART advertisements only contain the uid of a Crownstone
+        usb_sphere = self.cloud.cloud_data.find_by_id(self.usb_sphere_id)
+        if usb_sphere is not None:
+            self.uid_index.build(usb_sphere.crownstones)
+
+        # Batch updates from the UART thread before they enter the event loop
+        flush_interval = self.config_entry.options.get(
+            CONF_UART_FLUSH_INTERVAL, DEFAULT_UART_FLUSH_INTERVAL
+        )
+        self.uart_bridge = UartUpdateBridge(
+            self.hass,
+            flush_interval / 1000,
+            partial(async_update_crwn_state_uart, self),
+        )
+        # listen before the connection is established, to receive the ready state
+        setup_uart_listeners(self)
+
         # UartException is raised when serial controller fails to open
         try:
             await self.uart.initialize_usb(serial_port)
         except UartException:
             self.uart = None
+            self.uart_bridge.async_stop()
+            self.uart_bridge = None
+            for subscription_id in self.listeners.pop(UART_LISTENERS):
+                UartEventBus.unsubscribe(subscription_id)
             # Set entry options for usb to null
             updated_options = self.config_entry.options.copy()
             updated_options[CONF_USB_PATH] = None
@@ -159,9 +581,11 @@ class CrownstoneEntryManager:
                 "Crownstone",
                 "crownstone_usb_dongle_setup",
             )
-            return
-
-        setup_uart_listeners(self)
+        else:
+            # Switch commands issued together are sent in one mesh packet
+            self.mesh_switch = MeshSwitchBatcher(
+                self.hass, self.uart, MESH_SWITCH_BATCH_WINDOW
+            )
 
     async def async_unload(self) -> bool:
         """Unload the current config entry."""
@@ -169,14 +593,29 @@ class CrownstoneEntryManager:
         if self.cloud.cloud_data is None:
             return True
 
-        self.sse.close_client()
+        if self.cloud_sync_task is not None:
+            self.cloud_sync_task.cancel()
+
+        if self.sse is not None:
+            self.sse.async_stop()
+        self.event_queue.async_stop()
         for sse_unsub in self.listeners[SSE_LISTENERS]:
             sse_unsub()
+        if self.data_change_queue is not None:
+            self.data_change_queue.async_stop()
 
         if self.uart:
             self.uart.stop()
             for subscription_id in self.listeners[UART_LISTENERS]:
                 UartEventBus.unsubscribe(subscription_id)
+        if self.uart_bridge:
+            self.uart_bridge.async_stop()
+        if self.mesh_switch is not None:
+            self.mesh_switch.async_stop()
+            self.mesh_switch = None
+        self.cloud_scheduler.async_stop()
+        self.pending_commands.async_stop()
+        self.presence_filter.async_stop()
 
         unload_ok = await self.hass.config_entries.async_unload_platforms(
             self.config_entry, PLATFORMS
@@ -190,9 +629,23 @@ class CrownstoneEntryManager:
     @callback
     def on_shutdown(self, _: Event) -> None:
         """Close all IO connections."""
-        self.sse.close_client()
+        if self.cloud_sync_task is not None:
+            self.cloud_sync_task.cancel()
+        if self.sse is not None:
+            self.sse.async_stop()
+        self.event_queue.async_stop()
+        if self.data_change_queue is not None:
+            self.data_change_queue.async_stop()
         if self.uart:
             self.uart.stop()
+        if self.uart_bridge:
+            self.uart_bridge.async_stop()
+        if self.mesh_switch is not None:
+            self.mesh_switch.async_stop()
+            self.mesh_switch = None
+        self.cloud_scheduler.async_stop()
+        self.pending_commands.async_stop()
+        self.presence_filter.async_stop()
 
 
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
@@ -0,0 +1,126 @@
+"""Buffer Crownstone SSE events between the stream and their handlers."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+import logging
+import time
+from typing import Any
+
+from crownstone_sse.const import EVENT_DATA_CHANGE
+from crownstone_sse.events import Event
+
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+INTERACTIVE_LANE = "interactive"
+DATA_LANE = "data"
+
+
+class SSEEventQueue:
+    """
+    Queue SSE events in two bounded lanes, interactive events go first.
+
+    Switch states, presence and the other interactive events are handled
+    before data change events, so a storm of data changes does not delay them.
+    When a lane is full the oldest event in it is dropped, the stream is never blocked.
+    Events are handled in batches, the event loop gets a turn in between.
+    """
+
+    def __init__(
+        self,
+        process_event: Callable[[Event], None],
+        interactive_size: int,
+        data_size: int,
+        batch_size: int,
+    ) -> None:
+        """Initialize the queue."""
+        self.process_event = process_event
+        self.batch_size = batch_size
+        self._lanes: dict[str, deque[tuple[Event, float]]] = {
+            INTERACTIVE_LANE: deque(maxlen=interactive_size),
+            DATA_LANE: deque(maxlen=data_size),
+        }
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task[None] | None = None
+        # queue statistics per lane
+        self.received_count = {lane: 0 for lane in self._lanes}
+        self.dropped_count = {lane: 0 for lane in self._lanes}
+        self.max_depth = {lane: 0 for lane in self._lanes}
+        self.max_wait = {lane: 0.0 for lane in self._lanes}
+
+    @callback
+    def async_put(self, event: Event) -> None:
+        """Queue an event from the stream."""
+        lane = DATA_LANE if event.type == EVENT_DATA_CHANGE else INTERACTIVE_LANE
+        queue = self._lanes[lane]
+        self.received_count[lane] += 1
+        if len(queue) == queue.maxlen:
+            # the deque drops the oldest event on append
+            if not self.dropped_count[lane]:
+                _LOGGER.warning(
+                    "Crownstone %s event queue is full, dropping the oldest events",
+                    lane,
+                )
+            self.dropped_count[lane] += 1
+        queue.append((event, time.monotonic()))
+        self.max_depth[lane] = max(self.max_depth[lane], len(queue))
+
+        self._wakeup.set()
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._async_work())
+
+    def _pop(self) -> tuple[str, Event, float] | None:
+        """Return the next event, interactive events first."""
+        for lane, queue in self._lanes.items():
+            if queue:
+                event, queued_at = queue.popleft()
+                return lane, event, queued_at
+        return None
+
+    async def _async_work(self) -> None:
+        """Handle queued events until the queue is stopped."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            handled = 0
+            while True:
+                item = self._pop()
+                if item is None:
+                    break
+                lane, event, queued_at = item
+                self.max_wait[lane] = max(
+                    self.max_wait[lane], time.monotonic() - queued_at
+                )
+                try:
+                    self.process_event(event)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error handling Crownstone %s event", event.type)
+
+                handled += 1
+                if handled % self.batch_size == 0:
+                    await asyncio.sleep(0)
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop the queued events and stop the worker."""
+        for queue in self._lanes.values():
+            queue.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the queue."""
+        return {
+            lane: {
+                "received": self.received_count[lane],
+                "dropped": self.dropped_count[lane],
+                "depth": len(queue),
+                "max_depth": self.max_depth[lane],
+                "max_wait": round(self.max_wait[lane], 3),
+            }
+            for lane, queue in self._lanes.items()
+        }
@@ -1,29 +1,37 @@
 """Helper functions for the Crownstone integration."""
 from __future__ import annotations
 
+from collections.abc import Iterable
 import os
-from typing import TypeVar
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from crownstone_cloud.cloud_models.crownstones import Crownstone
 from crownstone_cloud.cloud_models.locations import Location
+from crownstone_cloud.cloud_models.spheres import Sphere
 from serial.tools.list_ports_common import ListPortInfo
 
 from homeassistant.components import usb
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.components.sensor import SensorDeviceClass
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import device_registry, entity_registry
 
 from .const import (
+    CONF_LOCATION,
+    CONF_SPHERE,
     CONNECTION_NAME_SUFFIX,
     DOMAIN,
     DONT_USE_USB,
     ENERGY_USAGE_NAME_SUFFIX,
     MANUAL_PATH,
     POWER_USAGE_NAME_SUFFIX,
+    PRESENCE_SUFFIX,
     REFRESH_LIST,
 )
 
+if TYPE_CHECKING:
+    from .entry_manager import CrownstoneEntryManager
+
 _T = TypeVar("_T")
 
 
@@ -86,9 +94,267 @@ def get_added_items(old_data: dict[str, _T], new_data: dict[str, _T]) -> list[_T
     return [new_data[dev_id] for dev_id in new_data if dev_id not in old_data]
 
 
+async def async_get_sphere_item_data(
+    sphere: Sphere,
+    endpoint: str,
+    item_id: str,
+    data_filter: dict[str, Any] | None = None,
+) -> list[dict[str, Any]] | None:
+    """
+    Get the cloud data of a single Crownstone or Location of a sphere.
+
+    Returns an empty list if the item no longer exists,
+    or None if the response can't be used to update a single item.
+    """
+    cloud_data = await sphere.cloud.request_handler.get(
+        "Spheres",
+        endpoint,
+        data_filter={**(data_filter or {}), "where": {"id": item_id}},
+        model_id=sphere.cloud_id,
+    )
+    if not isinstance(cloud_data, list) or len(cloud_data) > 1:
+        return None
+    if cloud_data and cloud_data[0].get("id") != item_id:
+        return None
+
+    return cloud_data
+
+
+class CrownstoneUidIndex:
+    """
+    Index of the Crownstones in the USB sphere by their mesh uid.
+
+    Used to resolve the Crownstone of a UART advertisement with a single dict lookup.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.data: dict[int, Crownstone] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, crownstones: Iterable[Crownstone]) -> None:
+        """Replace the index with the given Crownstones."""
+        self.data = {crownstone.unique_id: crownstone for crownstone in crownstones}
+
+    def add(self, crownstones: Iterable[Crownstone]) -> None:
+        """Add Crownstones to the index."""
+        for crownstone in crownstones:
+            self.data[crownstone.unique_id] = crownstone
+
+    def remove(self, crownstones: Iterable[Crownstone]) -> None:
+        """Remove Crownstones from the index."""
+        for crownstone in crownstones:
+            self.data.pop(crownstone.unique_id, None)
+
+    def get(self, uid: int) -> Crownstone | None:
+        """Return the Crownstone with this uid, or None if not in the index."""
+        crownstone = self.data.get(uid)
+        if crownstone is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return crownstone
+
+
+class PresenceIndex:
+    """
+    Index of the users present in the spheres and the location they are in.
+
+    The present people lists of the cloud data are kept in sync,
+    an enter or exit only touches the sphere, the old and the new location.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        # sphere id -> users present in the sphere
+        self.sphere_users: dict[str, set[str]] = {}
+        # (sphere id, user id) -> location the user is in
+        self.user_locations: dict[tuple[str, str], Location] = {}
+
+    def build(self, spheres: Iterable[Sphere]) -> None:
+        """Replace the index with the presence of the given spheres."""
+        self.sphere_users = {}
+        self.user_locations = {}
+        for sphere in spheres:
+            self.sphere_users[sphere.cloud_id] = set(sphere.present_people)
+            for location in sphere.locations:
+                for user_id in location.present_people:
+                    self.user_locations[(sphere.cloud_id, user_id)] = location
+
+    def enter_location(
+        self, sphere: Sphere, user_id: str, location: Location
+    ) -> list[str]:
+        """Move a user to a location, return the ids of the changed locations."""
+        old_location = self.user_locations.get((sphere.cloud_id, user_id))
+        if old_location is location:
+            return []
+
+        changed = [location.cloud_id]
+        if old_location is not None:
+            _discard(old_location.present_people, user_id)
+            changed.append(old_location.cloud_id)
+        location.present_people.append(user_id)
+        self.user_locations[(sphere.cloud_id, user_id)] = location
+        return changed
+
+    def enter_sphere(self, sphere: Sphere, user_id: str) -> list[str]:
+        """Add a user to a sphere, return the id of the sphere if it changed."""
+        sphere_users = self.sphere_users.setdefault(sphere.cloud_id, set())
+        if user_id in sphere_users:
+            return []
+
+        sphere_users.add(user_id)
+        sphere.present_people.append(user_id)
+        return [sphere.cloud_id]
+
+    def exit_sphere(self, sphere: Sphere, user_id: str) -> list[str]:
+        """Remove a user from a sphere and its location, return the changed ids."""
+        changed: list[str] = []
+        sphere_users = self.sphere_users.get(sphere.cloud_id, set())
+        if user_id in sphere_users:
+            sphere_users.discard(user_id)
+            _discard(sphere.present_people, user_id)
+            changed.append(sphere.cloud_id)
+
+        old_location = self.user_locations.pop((sphere.cloud_id, user_id), None)
+        if old_location is not None:
+            _discard(old_location.present_people, user_id)
+            changed.append(old_location.cloud_id)
+
+        return changed
+
+
+class PresenceEntityData:
+    """The sphere, location and users of a presence entity."""
+
+    def __init__(
+        self,
+        sphere_id: str,
+        location_id: str | None,
+        device: str,
+        users: set[str],
+    ) -> None:
+        """Initialize the presence entity data."""
+        self.sphere_id = sphere_id
+        # None for the presence entity of a sphere
+        self.location_id = location_id
+        self.device = device
+        # full names of the users of the sphere
+        self.users = users
+
+
+class PresenceEntityMap:
+    """
+    Map of presence entity ids to their sphere, location and users.
+
+    Used by device automations, so an automation is loaded with a single lookup.
+    Built on first use, invalidated when the cloud data or the entity registry changes.
+    """
+
+    def __init__(self, hass: HomeAssistant, config_entry_id: str) -> None:
+        """Initialize the map."""
+        self.hass = hass
+        self.config_entry_id = config_entry_id
+        self.data: dict[str, PresenceEntityData] | None = None
+        self.build_count = 0
+
+    @callback
+    def get(
+        self, entity_id: str, spheres: Iterable[Sphere]
+    ) -> PresenceEntityData | None:
+        """Return the data of a presence entity, build the map if it was invalidated."""
+        if self.data is None:
+            self.data = self._build(spheres)
+        return self.data.get(entity_id)
+
+    @callback
+    def _build(self, spheres: Iterable[Sphere]) -> dict[str, PresenceEntityData]:
+        """Resolve the presence entities of the config entry."""
+        self.build_count += 1
+        devices: dict[str, PresenceEntityData] = {}
+        for sphere in spheres:
+            users = {f"{user.first_name} {user.last_name}" for user in sphere.users}
+            devices[sphere.cloud_id] = PresenceEntityData(
+                sphere.cloud_id, None, CONF_SPHERE, users
+            )
+            for location in sphere.locations:
+                devices[location.cloud_id] = PresenceEntityData(
+                    sphere.cloud_id, location.cloud_id, CONF_LOCATION, users
+                )
+
+        data: dict[str, PresenceEntityData] = {}
+        registry = entity_registry.async_get(self.hass)
+        for entry in entity_registry.async_entries_for_config_entry(
+            registry, self.config_entry_id
+        ):
+            if not entry.unique_id.endswith(f"-{PRESENCE_SUFFIX}"):
+                continue
+            device = devices.get(entry.unique_id[: -(len(PRESENCE_SUFFIX) + 1)])
+            if device is not None:
+                data[entry.entity_id] = device
+
+        return data
+
+    @callback
+    def invalidate(self) -> None:
+        """Build the map again on the next lookup."""
+        self.data = None
+
+    @callback
+    def async_entity_registry_updated(self, event: Event) -> None:
+        """Invalidate the map when a presence entity of the config entry changed."""
+        if self.data is None:
+            return
+
+        # renamed or removed
+        if (
+            event.data["entity_id"] in self.data
+            or event.data.get("old_entity_id") in self.data
+        ):
+            self.invalidate()
+            return
+
+        if event.data["action"] == "create":
+            entry = entity_registry.async_get(self.hass).async_get(
+                event.data["entity_id"]
+            )
+            if (
+                entry is not None
+                and entry.config_entry_id == self.config_entry_id
+                and entry.unique_id.endswith(f"-{PRESENCE_SUFFIX}")
+            ):
+                self.invalidate()
+
+
+@callback
+def async_get_presence_entity(
+    hass: HomeAssistant, entity_id: str
+) -> tuple[CrownstoneEntryManager, PresenceEntityData] | None:
+    """Return the entry manager and the data of a presence entity."""
+    manager: CrownstoneEntryManager
+    for manager in hass.data.get(DOMAIN, {}).values():
+        if manager.cloud.cloud_data is None:
+            continue
+        presence_entity = manager.presence_entities.get(
+            entity_id, manager.cloud.cloud_data
+        )
+        if presence_entity is not None:
+            return manager, presence_entity
+
+    return None
+
+
+def _discard(present_people: list[str], user_id: str) -> None:
+    """Remove a user from a present people list, if in the list."""
+    if user_id in present_people:
+        present_people.remove(user_id)
+
+
 @callback
 def async_update_devices(
-    hass: HomeAssistant, new_data: dict[str, Crownstone | Location]
+    hass: HomeAssistant, new_data: dict[str, Crownstone | Location | Sphere]
 ) -> None:
     """Update device info when data is updated."""
     dev_reg = device_registry.async_get(hass)
@@ -128,7 +394,9 @@ def async_update_devices(
 
 @callback
 def async_remove_devices(
-    hass: HomeAssistant, entry_id: str, removed_devices: list[Crownstone]
+    hass: HomeAssistant,
+    entry_id: str,
+    removed_devices: list[Crownstone | Location | Sphere],
 ) -> None:
     """Remove devices from HA if they were removed from the Crownstone cloud."""
     dev_reg = device_registry.async_get(hass)
@@ -1,39 +1,54 @@
 """Support for Crownstone devices."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Awaitable, Callable
 from functools import partial
+import logging
 from typing import TYPE_CHECKING, Any
 
+import aiohttp
 from crownstone_cloud.cloud_models.crownstones import Crownstone, CrownstoneAbility
 from crownstone_cloud.const import (
     DIMMING_ABILITY,
     SWITCHCRAFT_ABILITY,
     TAP_TO_TOGGLE_ABILITY,
 )
-from crownstone_cloud.exceptions import CrownstoneAbilityError
+from crownstone_cloud.exceptions import (
+    CrownstoneAbilityError,
+    CrownstoneConnectionError,
+)
+from crownstone_core.protocol.BluenetTypes import SwitchValSpecial
 from crownstone_uart import CrownstoneUart
+import voluptuous as vol
 
 from homeassistant.components.light import ATTR_BRIGHTNESS, ColorMode, LightEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
     ABILITY,
+    ATTR_SWITCH_ON,
     CROWNSTONE_INCLUDE_TYPES,
     CROWNSTONE_SUFFIX,
     DOMAIN,
+    SERVICE_MULTI_SWITCH,
     SIG_ADD_CROWNSTONE_DEVICES,
     SIG_CROWNSTONE_STATE_UPDATE,
 )
 from .devices import CrownstoneBaseEntity
 from .helpers import map_from_to
+from .mesh_switch import MeshSwitchBatcher
 
 if TYPE_CHECKING:
     from .entry_manager import CrownstoneEntryManager
 
+_LOGGER = logging.getLogger(__name__)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -50,10 +65,7 @@ async def async_setup_entry(
         for crownstone in sphere.crownstones:
             if crownstone.type not in CROWNSTONE_INCLUDE_TYPES:
                 continue
-            if manager.uart and sphere.cloud_id == manager.usb_sphere_id:
-                entities.append(CrownstoneEntity(crownstone, manager.uart))
-            else:
-                entities.append(CrownstoneEntity(crownstone))
+            entities.append(CrownstoneEntity(manager, crownstone, sphere.cloud_id))
 
     # add callback for new devices
     manager.config_entry.async_on_unload(
@@ -66,6 +78,19 @@ async def async_setup_entry(
 
     async_add_entities(entities)
 
+    # switch several Crownstones in one mesh packet
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_MULTI_SWITCH,
+        {
+            vol.Required(ATTR_SWITCH_ON): cv.boolean,
+            vol.Optional(ATTR_BRIGHTNESS): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=255)
+            ),
+        },
+        "async_multi_switch",
+    )
+
 
 def crownstone_state_to_hass(value: int) -> int:
     """Crownstone 0..100 to hass 0..255."""
@@ -91,22 +116,85 @@ def async_add_crownstone_entities(
         if crownstone.type not in CROWNSTONE_INCLUDE_TYPES:
             continue
         # adding a Crownstone is done in 2 steps
-        # these parameters have to be added for initialization
-        crownstone.abilities = {
-            DIMMING_ABILITY: CrownstoneAbility(ABILITY),
-            TAP_TO_TOGGLE_ABILITY: CrownstoneAbility(ABILITY),
-            SWITCHCRAFT_ABILITY: CrownstoneAbility(ABILITY),
-        }
-        crownstone.data["currentSwitchState"] = {"switchState": 100}
-
-        if manager.uart and sphere_id == manager.usb_sphere_id:
-            entities.append(CrownstoneEntity(crownstone, manager.uart))
-        else:
-            entities.append(CrownstoneEntity(crownstone))
+        # these parameters have to be added for initialization,
+        # unless the Crownstone was already fully synced with the cloud
+        if not crownstone.abilities:
+            crownstone.abilities = {
+                DIMMING_ABILITY: CrownstoneAbility(ABILITY),
+                TAP_TO_TOGGLE_ABILITY: CrownstoneAbility(ABILITY),
+                SWITCHCRAFT_ABILITY: CrownstoneAbility(ABILITY),
+            }
+        if not crownstone.data.get("currentSwitchState"):
+            crownstone.data["currentSwitchState"] = {"switchState": 100}
+
+        entities.append(CrownstoneEntity(manager, crownstone, sphere_id))
 
     async_add_entities(entities)
 
 
+class LatestCommandCoalescer:
+    """
+    Run one command at a time, a pending command is replaced by a newer one.
+
+    Used for commands that overwrite each other, like the steps of a brightness slider.
+    Commands that don't run because the coalescer is stopped return False as well.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the coalescer."""
+        self._pending: tuple[
+            Callable[[], Awaitable[None]], asyncio.Future[bool]
+        ] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    async def async_run(self, command: Callable[[], Awaitable[None]]) -> bool:
+        """
+        Run a command after the command that is in flight.
+
+        Returns False if the command was replaced by a newer command before it ran.
+        """
+        if self._pending is not None and not self._pending[1].done():
+            self._pending[1].set_result(False)
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        self._pending = (command, future)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._async_run_pending())
+
+        return await future
+
+    async def _async_run_pending(self) -> None:
+        """Run the pending commands until there are none left."""
+        while self._pending is not None:
+            command, future = self._pending
+            self._pending = None
+            try:
+                await command()
+            except asyncio.CancelledError:
+                # stopped while the command was in flight
+                if not future.done():
+                    future.set_result(False)
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                # raised to the caller of the command
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(True)
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop the pending command and cancel the command in flight."""
+        if self._pending is not None:
+            if not self._pending[1].done():
+                self._pending[1].set_result(False)
+            self._pending = None
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
 class CrownstoneEntity(CrownstoneBaseEntity, LightEntity):
     """
     Representation of a crownstone.
@@ -117,15 +205,28 @@ class CrownstoneEntity(CrownstoneBaseEntity, LightEntity):
     _attr_icon = "mdi:power-socket-de"
 
     def __init__(
-        self, crownstone_data: Crownstone, usb: CrownstoneUart | None = None
+        self,
+        entry_manager: CrownstoneEntryManager,
+        crownstone_data: Crownstone,
+        sphere_id: str,
     ) -> None:
         """Initialize the crownstone."""
         super().__init__(crownstone_data)
-        self.usb = usb
+        self.manager = entry_manager
+        self.sphere_id = sphere_id
+        # a slider sends many brightness commands, only the latest is sent to the cloud
+        self._cloud_commands = LatestCommandCoalescer()
         # Entity class attributes
         self._attr_name = str(self.device.name)
         self._attr_unique_id = f"{self.cloud_id}-{CROWNSTONE_SUFFIX}"
 
+    @property
+    def usb(self) -> CrownstoneUart | None:
+        """Return the USB dongle if this Crownstone is in its sphere."""
+        if self.sphere_id != self.manager.usb_sphere_id:
+            return None
+        return self.manager.uart
+
     @property
     def brightness(self) -> int | None:
         """Return the brightness if dimming enabled."""
@@ -153,54 +254,132 @@ class CrownstoneEntity(CrownstoneBaseEntity, LightEntity):
         # new state received
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, SIG_CROWNSTONE_STATE_UPDATE, self.async_write_ha_state
+                self.hass,
+                SIG_CROWNSTONE_STATE_UPDATE.format(self.cloud_id),
+                self.async_write_ha_state,
             )
         )
 
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop the cloud commands when this entity is removed from HA."""
+        self._cloud_commands.async_stop()
+
+    async def _async_send_cloud_command(
+        self, command: Callable[[], Awaitable[None]]
+    ) -> bool:
+        """
+        Send a switch command via the cloud, if the cloud can be reached.
+
+        Returns False if the command was replaced by a newer command.
+        """
+        if not self.manager.cloud_ready:
+            raise HomeAssistantError(
+                f"Unable to switch {self.name}, "
+                "the Crownstone Cloud is not connected and no USB dongle is ready"
+            )
+        try:
+            return await self._cloud_commands.async_run(
+                partial(self.manager.cloud_scheduler.async_run, self.sphere_id, command)
+            )
+        except CrownstoneAbilityError as ability_error:
+            raise HomeAssistantError(ability_error) from ability_error
+        except (
+            CrownstoneConnectionError,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ) as connection_error:
+            raise HomeAssistantError(
+                f"Unable to switch {self.name}, "
+                "the Crownstone Cloud could not be reached"
+            ) from connection_error
+
+    @property
+    def mesh_switch(self) -> MeshSwitchBatcher | None:
+        """Return the switch batcher of the USB dongle, if the dongle is ready."""
+        if self.usb is not None and self.usb.is_ready():
+            return self.manager.mesh_switch
+        return None
+
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn on this light via dongle or cloud."""
         if ATTR_BRIGHTNESS in kwargs:
-            if self.usb is not None and self.usb.is_ready():
-                await self.hass.async_add_executor_job(
-                    partial(
-                        self.usb.dim_crownstone,
-                        self.device.unique_id,
-                        hass_to_crownstone_state(kwargs[ATTR_BRIGHTNESS]),
-                    )
-                )
-            else:
-                try:
-                    await self.device.async_set_brightness(
-                        hass_to_crownstone_state(kwargs[ATTR_BRIGHTNESS])
-                    )
-                except CrownstoneAbilityError as ability_error:
-                    raise HomeAssistantError(ability_error) from ability_error
-
-            # assume brightness is set on device
-            self.device.state = hass_to_crownstone_state(kwargs[ATTR_BRIGHTNESS])
-            self.async_write_ha_state()
-
-        elif self.usb is not None and self.usb.is_ready():
-            await self.hass.async_add_executor_job(
-                partial(self.usb.switch_crownstone, self.device.unique_id, on=True)
+            brightness = hass_to_crownstone_state(kwargs[ATTR_BRIGHTNESS])
+            await self._async_switch(
+                brightness,
+                brightness,
+                partial(self.device.async_set_brightness, brightness),
             )
-            self.device.state = 100
-            self.async_write_ha_state()
-
         else:
-            await self.device.async_turn_on()
-            self.device.state = 100
-            self.async_write_ha_state()
+            await self._async_switch(
+                SwitchValSpecial.SMART_ON, 100, self.device.async_turn_on
+            )
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off this device via dongle or cloud."""
-        if self.usb is not None and self.usb.is_ready():
-            await self.hass.async_add_executor_job(
-                partial(self.usb.switch_crownstone, self.device.unique_id, on=False)
-            )
+        await self._async_switch(0, 0, self.device.async_turn_off)
 
+    async def _async_switch(
+        self,
+        switch_value: int,
+        state: int,
+        cloud_command: Callable[[], Awaitable[None]],
+    ) -> None:
+        """
+        Switch via dongle or cloud and assume the new state.
+
+        The state is kept until the Crownstone confirms it,
+        or rolled back when no confirmation arrives.
+        """
+        previous_state = self.device.state
+        mesh_switch = self.mesh_switch
+        if mesh_switch is not None:
+            resend = partial(
+                mesh_switch.async_switch, self.device.unique_id, switch_value
+            )
+            resend()
+            via = "usb"
+        elif await self._async_send_cloud_command(cloud_command):
+            resend = partial(self._async_resend_cloud_command, cloud_command)
+            via = "cloud"
         else:
-            await self.device.async_turn_off()
+            return
 
-        self.device.state = 0
+        self.device.state = state
         self.async_write_ha_state()
+        self.manager.pending_commands.async_add(
+            self.device,
+            state,
+            previous_state,
+            switch_value == SwitchValSpecial.SMART_ON,
+            resend,
+            via,
+        )
+
+    @callback
+    def _async_resend_cloud_command(
+        self, cloud_command: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Send a command via the cloud again, when it was not confirmed."""
+
+        async def _async_resend() -> None:
+            try:
+                await self._async_send_cloud_command(cloud_command)
+            except HomeAssistantError as err:
+                _LOGGER.warning("Sending the command again failed: %s", err)
+
+        self.hass.async_create_task(_async_resend())
+
+    async def async_multi_switch(
+        self, switch_on: bool, brightness: int | None = None
+    ) -> None:
+        """
+        Switch this Crownstone as part of a multi switch.
+
+        The commands of all targeted Crownstones are collected in one batch.
+        """
+        if not switch_on:
+            await self.async_turn_off()
+        elif brightness is not None and self.color_mode == ColorMode.BRIGHTNESS:
+            await self.async_turn_on(brightness=brightness)
+        else:
+            await self.async_turn_on()
@@ -6,9 +6,13 @@ For fast device switching Local Push is used in form of a USB dongle that hooks
 """
 from __future__ import annotations
 
+import asyncio
 from functools import partial
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, Final, cast
 
+from crownstone_cloud.cloud_models.crownstones import Crownstone
+from crownstone_cloud.cloud_models.locations import Location
+from crownstone_cloud.cloud_models.spheres import Sphere
 from crownstone_cloud.exceptions import CrownstoneNotFoundError
 from crownstone_core.packets.serviceDataParsers.containers.AdvExternalCrownstoneState import (
     AdvExternalCrownstoneState,
@@ -19,7 +23,6 @@ from crownstone_core.packets.serviceDataParsers.containers.elements.AdvTypes imp
 from crownstone_core.protocol.SwitchState import SwitchState
 from crownstone_sse.const import (
     EVENT_ABILITY_CHANGE,
-    EVENT_ABILITY_CHANGE_DIMMING,
     EVENT_DATA_CHANGE,
     EVENT_DATA_CHANGE_CROWNSTONE,
     EVENT_DATA_CHANGE_LOCATIONS,
@@ -32,9 +35,7 @@ from crownstone_sse.const import (
     EVENT_SWITCH_STATE_UPDATE,
     EVENT_SYSTEM,
     EVENT_SYSTEM_STREAM_START,
-    OPERATION_CREATE,
     OPERATION_DELETE,
-    OPERATION_UPDATE,
 )
 from crownstone_sse.events import (
     AbilityChangeEvent,
@@ -46,27 +47,24 @@ from crownstone_sse.events import (
 from crownstone_uart import UartEventBus, UartTopics
 from crownstone_uart.topics.SystemTopics import SystemTopics
 
-from homeassistant.core import Event, callback
-from homeassistant.helpers.dispatcher import (
-    async_dispatcher_connect,
-    async_dispatcher_send,
-    dispatcher_send,
-)
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send, dispatcher_send
 
 from .const import (
-    DOMAIN,
     SIG_ADD_CROWNSTONE_DEVICES,
     SIG_ADD_PRESENCE_DEVICES,
     SIG_CROWNSTONE_STATE_UPDATE,
     SIG_ENERGY_STATE_UPDATE,
     SIG_POWER_STATE_UPDATE,
-    SIG_PRESENCE_STATE_UPDATE,
+    SIG_PRESENCE_UPDATE,
     SIG_SSE_STATE_CHANGE,
     SIG_UART_STATE_CHANGE,
+    SIG_USER_DATA_UPDATE,
     SSE_LISTENERS,
     UART_LISTENERS,
 )
 from .helpers import (
+    async_get_sphere_item_data,
     async_remove_devices,
     async_update_devices,
     get_added_items,
@@ -76,6 +74,11 @@ from .helpers import (
 if TYPE_CHECKING:
     from .entry_manager import CrownstoneEntryManager
 
+# same data as requested by the library when updating all Crownstones
+CROWNSTONE_DATA_FILTER: Final[dict[str, Any]] = {
+    "include": ["currentSwitchState", {"abilities": "properties"}]
+}
+
 
 @callback
 def async_update_sse_state(
@@ -96,10 +99,19 @@ def async_update_crwn_state_sse(
     except CrownstoneNotFoundError:
         return
 
+    # a state that doesn't confirm a pending command is held back
+    if manager.pending_commands.async_report(
+        updated_crownstone, switch_event.switch_state
+    ):
+        return
+
     # only update on change.
     if updated_crownstone.state != switch_event.switch_state:
         updated_crownstone.state = switch_event.switch_state
-        async_dispatcher_send(manager.hass, SIG_CROWNSTONE_STATE_UPDATE)
+        async_dispatcher_send(
+            manager.hass,
+            SIG_CROWNSTONE_STATE_UPDATE.format(updated_crownstone.cloud_id),
+        )
 
 
 @callback
@@ -119,22 +131,19 @@ def async_update_crwn_ability(
         return
 
     # write the change to the crownstone entity.
+    # the supported color modes follow the dimming ability on the next state write
     updated_crownstone.abilities[ability_type].is_enabled = ability_enabled
-
-    if ability_event.sub_type == EVENT_ABILITY_CHANGE_DIMMING:
-        # reload the config entry because dimming is part of supported features
-        manager.hass.async_create_task(
-            manager.hass.config_entries.async_reload(manager.config_entry.entry_id)
-        )
-    else:
-        async_dispatcher_send(manager.hass, SIG_CROWNSTONE_STATE_UPDATE)
+    async_dispatcher_send(
+        manager.hass,
+        SIG_CROWNSTONE_STATE_UPDATE.format(updated_crownstone.cloud_id),
+    )
 
 
 @callback
-def async_update_presence(manager: CrownstoneEntryManager, ha_event: Event) -> None:
+def async_update_presence(
+    manager: CrownstoneEntryManager, presence_event: PresenceEvent
+) -> None:
     """Update the presence in a Location or in a Sphere."""
-    presence_event = PresenceEvent(ha_event.data)
-
     sphere = manager.cloud.cloud_data.find_by_id(presence_event.sphere_id)
     if sphere is None:
         return
@@ -144,188 +153,357 @@ def async_update_presence(manager: CrownstoneEntryManager, ha_event: Event) -> N
         return
 
     if presence_event.sub_type == EVENT_PRESENCE_ENTER_LOCATION:
-        # remove the user from all locations, we only listen for enter events
-        for location in sphere.locations:
-            if user.cloud_id in location.present_people:
-                location.present_people.remove(user.cloud_id)
-
+        # a user is in one location, entering a location means leaving the other
         location_entered = sphere.locations.find_by_id(presence_event.location_id)
         if location_entered is None:
             return
-        location_entered.present_people.append(user.cloud_id)
+        changed = manager.presence_index.enter_location(
+            sphere, user.cloud_id, location_entered
+        )
     elif presence_event.sub_type == EVENT_PRESENCE_ENTER_SPHERE:
-        if user.cloud_id in sphere.present_people:
-            pass
-        else:
-            sphere.present_people.append(user.cloud_id)
+        changed = manager.presence_index.enter_sphere(sphere, user.cloud_id)
     elif presence_event.sub_type == EVENT_PRESENCE_EXIT_SPHERE:
-        if user.cloud_id in sphere.present_people:
-            sphere.present_people.remove(user.cloud_id)
-        # remove the user from all other locations, if still present
-        for location in sphere.locations:
-            if user.cloud_id in location.present_people:
-                location.present_people.remove(user.cloud_id)
+        changed = manager.presence_index.exit_sphere(sphere, user.cloud_id)
     else:
         return
 
-    async_dispatcher_send(manager.hass, SIG_PRESENCE_STATE_UPDATE)
+    # only the presence entities of the changed sphere and locations are written
+    for cloud_id in changed:
+        async_dispatcher_send(manager.hass, SIG_PRESENCE_UPDATE.format(cloud_id))
 
 
-async def async_update_data(
+@callback
+def async_queue_data_change(
     manager: CrownstoneEntryManager, data_change_event: DataChangeEvent
 ) -> None:
-    """Update user data and remove or add new devices when detected."""
+    """Queue a data change event, bursts of events are handled together."""
+    if manager.data_change_queue is not None:
+        manager.data_change_queue.async_add(data_change_event)
+
+
+async def async_update_data(
+    manager: CrownstoneEntryManager, data_change_events: list[DataChangeEvent]
+) -> None:
+    """
+    Update user data and remove or add new devices when detected.
+
+    The events all have the same sphere and sub type.
+    """
+    data_change_event = data_change_events[-1]
+    if data_change_event.sub_type == EVENT_DATA_CHANGE_SPHERES:
+        await async_update_sphere_data(manager)
+        manager.presence_entities.invalidate()
+        manager.store.async_delay_save(manager.cloud)
+        return
+
     sphere = manager.cloud.cloud_data.find_by_id(data_change_event.sphere_id)
     if sphere is None:
         return
 
-    if data_change_event.sub_type == EVENT_DATA_CHANGE_CROWNSTONE:
-        old_data = sphere.crownstones.data.copy()
-        await sphere.crownstones.async_update_crownstone_data()
+    # a single changed item is requested on its own, several items at once
+    single_item = len({get_changed_item_id(event) for event in data_change_events}) == 1
 
-        if data_change_event.operation == OPERATION_UPDATE:
-            async_update_devices(manager.hass, sphere.crownstones.data)
-        if data_change_event.operation == OPERATION_CREATE:
-            async_dispatcher_send(
-                manager.hass,
-                SIG_ADD_CROWNSTONE_DEVICES,
-                get_added_items(old_data, sphere.crownstones.data),
-                sphere.cloud_id,
-            )
-        if data_change_event.operation == OPERATION_DELETE:
-            async_remove_devices(
-                manager.hass,
-                manager.config_entry.entry_id,
-                get_removed_items(old_data, sphere.crownstones.data),
-            )
+    if data_change_event.sub_type == EVENT_DATA_CHANGE_CROWNSTONE:
+        if not (
+            single_item
+            and await async_update_crownstone_item(manager, sphere, data_change_event)
+        ):
+            await async_update_crownstone_data(manager, sphere)
 
     if data_change_event.sub_type == EVENT_DATA_CHANGE_LOCATIONS:
-        old_data = sphere.locations.data.copy()
-        await sphere.locations.async_update_location_data()
+        if not (
+            single_item
+            and await async_update_location_item(manager, sphere, data_change_event)
+        ):
+            await async_update_location_data(manager, sphere)
+        manager.presence_index.build(manager.cloud.cloud_data)
 
-        if data_change_event.operation == OPERATION_UPDATE:
-            async_update_devices(manager.hass, sphere.locations.data)
-        if data_change_event.operation == OPERATION_CREATE:
-            async_dispatcher_send(
-                manager.hass,
-                SIG_ADD_PRESENCE_DEVICES,
-                get_added_items(old_data, sphere.locations.data),
-                sphere.cloud_id,
-            )
-        if data_change_event.operation == OPERATION_DELETE:
+    if data_change_event.sub_type == EVENT_DATA_CHANGE_USERS:
+        await sphere.users.async_update_user_data()
+        async_dispatcher_send(
+            manager.hass, SIG_USER_DATA_UPDATE.format(sphere.cloud_id)
+        )
+
+    # spheres, locations and users of the presence entities may have changed
+    manager.presence_entities.invalidate()
+    manager.store.async_delay_save(manager.cloud)
+
+
+async def async_update_sphere_data(manager: CrownstoneEntryManager) -> None:
+    """Update the spheres and add or remove their devices, without a reload."""
+    spheres = manager.cloud.cloud_data
+    old_data = spheres.data.copy()
+    await spheres.async_update_sphere_data()
+
+    async_update_devices(manager.hass, spheres.data)
+
+    added_spheres = get_added_items(old_data, spheres.data)
+    for sphere in added_spheres:
+        # a new sphere includes an entire new stack of devices
+        await asyncio.gather(
+            sphere.async_update_sphere_presence(),
+            sphere.crownstones.async_update_crownstone_data(),
+            sphere.locations.async_update_location_data(),
+            sphere.locations.async_update_location_presence(),
+            sphere.users.async_update_user_data(),
+        )
+    manager.async_add_spheres(added_spheres)
+    manager.async_remove_spheres(get_removed_items(old_data, spheres.data))
+    manager.presence_index.build(spheres)
+
+
+def get_changed_item_id(data_change_event: DataChangeEvent) -> str | None:
+    """Return the id of the changed item, if the event contains one."""
+    try:
+        return data_change_event.changed_item_id
+    except (KeyError, TypeError):
+        return None
+
+
+async def async_update_crownstone_item(
+    manager: CrownstoneEntryManager, sphere: Sphere, data_change_event: DataChangeEvent
+) -> bool:
+    """
+    Update, add or remove the Crownstone of a data change event.
+
+    Returns False if the event can't be handled without updating all Crownstones.
+    """
+    crownstone_id = get_changed_item_id(data_change_event)
+    if crownstone_id is None:
+        return False
+
+    crownstone = sphere.crownstones.find_by_id(crownstone_id)
+    if data_change_event.operation == OPERATION_DELETE:
+        cloud_data: list[dict[str, Any]] | None = []
+    else:
+        cloud_data = await async_get_sphere_item_data(
+            sphere, "ownedStones", crownstone_id, CROWNSTONE_DATA_FILTER
+        )
+    if cloud_data is None:
+        return False
+
+    if not cloud_data:
+        if crownstone is not None:
+            del sphere.crownstones.data[crownstone_id]
+            if sphere.cloud_id == manager.usb_sphere_id:
+                manager.uid_index.remove([crownstone])
             async_remove_devices(
-                manager.hass,
-                manager.config_entry.entry_id,
-                get_removed_items(old_data, sphere.locations.data),
+                manager.hass, manager.config_entry.entry_id, [crownstone]
             )
+        return True
+
+    if crownstone is not None:
+        # keep the existing object, entities hold a reference to it
+        crownstone.data = cloud_data[0]
+        crownstone.update_abilities()
+        async_update_devices(manager.hass, {crownstone_id: crownstone})
+        return True
+
+    crownstone = Crownstone(manager.cloud, cloud_data[0])
+    crownstone.update_abilities()
+    sphere.crownstones.data[crownstone_id] = crownstone
+    if sphere.cloud_id == manager.usb_sphere_id:
+        manager.uid_index.add([crownstone])
+    async_dispatcher_send(
+        manager.hass, SIG_ADD_CROWNSTONE_DEVICES, [crownstone], sphere.cloud_id
+    )
+    return True
+
+
+async def async_update_crownstone_data(
+    manager: CrownstoneEntryManager, sphere: Sphere
+) -> None:
+    """Update all Crownstones of a sphere and add or remove devices."""
+    old_data = sphere.crownstones.data.copy()
+    await sphere.crownstones.async_update_crownstone_data()
 
-    if data_change_event.sub_type == EVENT_DATA_CHANGE_USERS:
-        await sphere.users.async_update_user_data()
+    async_update_devices(manager.hass, sphere.crownstones.data)
 
-    if data_change_event.sub_type == EVENT_DATA_CHANGE_SPHERES:
-        # spheres can include an entire new stack of devices
-        manager.hass.async_create_task(
-            manager.hass.config_entries.async_reload(manager.config_entry.entry_id)
+    added_crownstones = get_added_items(old_data, sphere.crownstones.data)
+    if added_crownstones:
+        if sphere.cloud_id == manager.usb_sphere_id:
+            manager.uid_index.add(added_crownstones)
+        async_dispatcher_send(
+            manager.hass,
+            SIG_ADD_CROWNSTONE_DEVICES,
+            added_crownstones,
+            sphere.cloud_id,
         )
 
+    removed_crownstones = get_removed_items(old_data, sphere.crownstones.data)
+    if removed_crownstones:
+        if sphere.cloud_id == manager.usb_sphere_id:
+            manager.uid_index.remove(removed_crownstones)
+        async_remove_devices(
+            manager.hass,
+            manager.config_entry.entry_id,
+            removed_crownstones,
+        )
 
-def update_uart_state(manager: CrownstoneEntryManager, _: bool | None) -> None:
-    """Update the uart ready state for entities that use USB."""
-    # update availability of power usage entities.
-    dispatcher_send(manager.hass, SIG_UART_STATE_CHANGE)
 
+async def async_update_location_item(
+    manager: CrownstoneEntryManager, sphere: Sphere, data_change_event: DataChangeEvent
+) -> bool:
+    """
+    Update, add or remove the Location of a data change event.
 
-def update_crwn_state_uart(
-    manager: CrownstoneEntryManager, data: AdvExternalCrownstoneState
-) -> None:
-    """Update the state of a Crownstone when switched externally."""
-    if data.type != AdvType.EXTERNAL_STATE:
-        return
-    try:
-        updated_crownstone = manager.cloud.get_crownstone_by_uid(
-            data.crownstoneId, manager.usb_sphere_id
+    Returns False if the event can't be handled without updating all Locations.
+    """
+    location_id = get_changed_item_id(data_change_event)
+    if location_id is None:
+        return False
+
+    location = sphere.locations.find_by_id(location_id)
+    if data_change_event.operation == OPERATION_DELETE:
+        cloud_data: list[dict[str, Any]] | None = []
+    else:
+        cloud_data = await async_get_sphere_item_data(
+            sphere, "ownedLocations", location_id
         )
-    except CrownstoneNotFoundError:
-        return
+    if cloud_data is None:
+        return False
 
-    if data.switchState is None:
-        return
-    # update on change
-    updated_state = cast(SwitchState, data.switchState)
-    if updated_crownstone.state != updated_state.intensity:
-        updated_crownstone.state = updated_state.intensity
+    if not cloud_data:
+        if location is not None:
+            del sphere.locations.data[location_id]
+            async_remove_devices(
+                manager.hass, manager.config_entry.entry_id, [location]
+            )
+        return True
 
-        dispatcher_send(manager.hass, SIG_CROWNSTONE_STATE_UPDATE)
+    if location is not None:
+        # keep the existing object, entities hold a reference to it
+        location.data = cloud_data[0]
+        async_update_devices(manager.hass, {location_id: location})
+        return True
 
+    location = Location(cloud_data[0])
+    sphere.locations.data[location_id] = location
+    async_dispatcher_send(
+        manager.hass, SIG_ADD_PRESENCE_DEVICES, [location], sphere.cloud_id
+    )
+    return True
 
-def update_power_usage(
-    manager: CrownstoneEntryManager, data: AdvExternalCrownstoneState
+
+async def async_update_location_data(
+    manager: CrownstoneEntryManager, sphere: Sphere
 ) -> None:
-    """Update the power usage of a Crownstone."""
-    if data.type != AdvType.EXTERNAL_STATE:
-        return
-    try:
-        updated_crownstone = manager.cloud.get_crownstone_by_uid(
-            data.crownstoneId, manager.usb_sphere_id
+    """Update all Locations of a sphere and add or remove devices."""
+    old_data = sphere.locations.data.copy()
+    await sphere.locations.async_update_location_data()
+
+    async_update_devices(manager.hass, sphere.locations.data)
+
+    added_locations = get_added_items(old_data, sphere.locations.data)
+    if added_locations:
+        async_dispatcher_send(
+            manager.hass,
+            SIG_ADD_PRESENCE_DEVICES,
+            added_locations,
+            sphere.cloud_id,
         )
-    except CrownstoneNotFoundError:
-        return
 
-    if int(data.powerUsageReal) < 0:
-        updated_crownstone.power_usage = 0
-    else:
-        updated_crownstone.power_usage = int(data.powerUsageReal)
+    removed_locations = get_removed_items(old_data, sphere.locations.data)
+    if removed_locations:
+        async_remove_devices(
+            manager.hass,
+            manager.config_entry.entry_id,
+            removed_locations,
+        )
 
-    dispatcher_send(manager.hass, SIG_POWER_STATE_UPDATE)
 
+def update_uart_state(manager: CrownstoneEntryManager, _: bool | None) -> None:
+    """Update the uart ready state for entities that use USB."""
+    # update availability of power usage entities.
+    dispatcher_send(manager.hass, SIG_UART_STATE_CHANGE)
 
-def update_energy_usage(
+
+def update_crwn_state_uart(
     manager: CrownstoneEntryManager, data: AdvExternalCrownstoneState
 ) -> None:
-    """Update the energy usage of a Crownstone."""
+    """Pass a Crownstone state advertisement to the event loop."""
     if data.type != AdvType.EXTERNAL_STATE:
         return
-    try:
-        updated_crownstone = manager.cloud.get_crownstone_by_uid(
-            data.crownstoneId, manager.usb_sphere_id
-        )
-    except CrownstoneNotFoundError:
-        return
+    if manager.uart_bridge is not None:
+        manager.uart_bridge.add(data)
 
-    updated_crownstone.energy_usage = int(data.accumulatedEnergy)
 
-    dispatcher_send(manager.hass, SIG_ENERGY_STATE_UPDATE)
+@callback
+def async_update_crwn_state_uart(
+    manager: CrownstoneEntryManager, batch: list[AdvExternalCrownstoneState]
+) -> None:
+    """
+    Update the switch state, power usage and energy usage of Crownstones.
+
+    Every advertisement is decoded and resolved once,
+    only the entities of the fields that changed are updated.
+    """
+    for data in batch:
+        updated_crownstone = manager.uid_index.get(data.crownstoneId)
+        if updated_crownstone is None:
+            continue
+
+        cloud_id = updated_crownstone.cloud_id
+
+        if data.switchState is not None:
+            intensity = cast(SwitchState, data.switchState).intensity
+            # a state that doesn't confirm a pending command is held back
+            if (
+                not manager.pending_commands.async_report(updated_crownstone, intensity)
+                and updated_crownstone.state != intensity
+            ):
+                updated_crownstone.state = intensity
+                async_dispatcher_send(
+                    manager.hass, SIG_CROWNSTONE_STATE_UPDATE.format(cloud_id)
+                )
+
+        power_usage = max(int(data.powerUsageReal), 0)
+        if updated_crownstone.power_usage != power_usage:
+            updated_crownstone.power_usage = power_usage
+            async_dispatcher_send(manager.hass, SIG_POWER_STATE_UPDATE.format(cloud_id))
+
+        energy_usage = int(data.accumulatedEnergy)
+        if updated_crownstone.energy_usage != energy_usage:
+            updated_crownstone.energy_usage = energy_usage
+            async_dispatcher_send(
+                manager.hass, SIG_ENERGY_STATE_UPDATE.format(cloud_id)
+            )
 
 
 def setup_sse_listeners(manager: CrownstoneEntryManager) -> None:
     """Set up SSE listeners."""
     # save unsub function for when entry removed
     manager.listeners[SSE_LISTENERS] = [
-        async_dispatcher_connect(
-            manager.hass,
-            f"{DOMAIN}_{EVENT_SYSTEM}",
+        manager.async_subscribe_event(
             partial(async_update_sse_state, manager),
+            EVENT_SYSTEM,
+            EVENT_SYSTEM_STREAM_START,
         ),
-        async_dispatcher_connect(
-            manager.hass,
-            f"{DOMAIN}_{EVENT_SWITCH_STATE_UPDATE}",
+        manager.async_subscribe_event(
             partial(async_update_crwn_state_sse, manager),
+            EVENT_SWITCH_STATE_UPDATE,
         ),
-        async_dispatcher_connect(
-            manager.hass,
-            f"{DOMAIN}_{EVENT_ABILITY_CHANGE}",
+        manager.async_subscribe_event(
             partial(async_update_crwn_ability, manager),
+            EVENT_ABILITY_CHANGE,
         ),
-        async_dispatcher_connect(
-            manager.hass,
-            f"{DOMAIN}_{EVENT_DATA_CHANGE}",
-            partial(async_update_data, manager),
-        ),
-        manager.hass.bus.async_listen(
-            f"{DOMAIN}_{EVENT_PRESENCE}",
-            partial(async_update_presence, manager),
+        # presence events are filtered before they update the presence
+        manager.async_subscribe_event(
+            manager.presence_filter.async_process, EVENT_PRESENCE
         ),
     ]
+    # only the data that is kept by the integration is refreshed
+    for sub_type in (
+        EVENT_DATA_CHANGE_SPHERES,
+        EVENT_DATA_CHANGE_CROWNSTONE,
+        EVENT_DATA_CHANGE_LOCATIONS,
+        EVENT_DATA_CHANGE_USERS,
+    ):
+        manager.listeners[SSE_LISTENERS].append(
+            manager.async_subscribe_event(
+                partial(async_queue_data_change, manager), EVENT_DATA_CHANGE, sub_type
+            )
+        )
 
 
 def setup_uart_listeners(manager: CrownstoneEntryManager) -> None:
@@ -344,12 +522,4 @@ def setup_uart_listeners(manager: CrownstoneEntryManager) -> None:
             UartTopics.newDataAvailable,
             partial(update_crwn_state_uart, manager),
         ),
-        UartEventBus.subscribe(
-            UartTopics.newDataAvailable,
-            partial(update_power_usage, manager),
-        ),
-        UartEventBus.subscribe(
-            UartTopics.newDataAvailable,
-            partial(update_energy_usage, manager),
-        ),
     ]
@@ -0,0 +1,177 @@
+"""Batch switch commands for the Crownstones in the mesh of the USB dongle."""
+from __future__ import annotations
+
+import asyncio
+from asyncio import TimerHandle
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
+import time
+
+from crownstone_core.protocol.BlePackets import ControlPacket
+from crownstone_core.protocol.BluenetTypes import ControlType
+from crownstone_core.protocol.MeshPackets import (
+    MeshMultiSwitchPacket,
+    StoneMultiSwitchPacket,
+)
+from crownstone_uart import CrownstoneUart, UartEventBus
+from crownstone_uart.core.uart.UartTypes import UartMessageType, UartTxType
+from crownstone_uart.core.uart.uartPackets.UartMessagePacket import UartMessagePacket
+from crownstone_uart.core.uart.uartPackets.UartWrapperPacket import UartWrapperPacket
+from crownstone_uart.topics.SystemTopics import SystemTopics
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import MULTI_SWITCH_MAX_ITEMS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def send_multi_switch(switch_values: dict[int, int]) -> None:
+    """
+    Send switch values to Crownstones in multi switch packets.
+
+    Built the same way as a single switch by the crownstone_uart library,
+    with all Crownstones in one packet instead of one packet per Crownstone.
+    """
+    items = list(switch_values.items())
+    for index in range(0, len(items), MULTI_SWITCH_MAX_ITEMS):
+        multi_switch_packet = MeshMultiSwitchPacket(
+            [
+                StoneMultiSwitchPacket(crownstone_uid, switch_value)
+                for crownstone_uid, switch_value in items[
+                    index : index + MULTI_SWITCH_MAX_ITEMS
+                ]
+            ]
+        ).serialize()
+        control_packet = (
+            ControlPacket(ControlType.MULTISWITCH)
+            .loadByteArray(multi_switch_packet)
+            .serialize()
+        )
+        uart_message = UartMessagePacket(UartTxType.CONTROL, control_packet).serialize()
+        uart_packet = UartWrapperPacket(
+            UartMessageType.UART_MESSAGE, uart_message
+        ).serialize()
+        UartEventBus.emit(SystemTopics.uartWriteData, uart_packet)
+
+
+class MeshSwitchBatcher:
+    """
+    Collect switch commands and send them to the mesh in one go.
+
+    Commands issued within the batch window, like the lights of a scene,
+    are sent as one multi switch packet instead of a packet per Crownstone.
+    Only the latest value per Crownstone is sent.
+
+    Packets are written by a single writer task with its own thread,
+    switching does not wait for a slot in the shared executor.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, uart: CrownstoneUart, batch_window: float
+    ) -> None:
+        """Initialize the batcher."""
+        self.hass = hass
+        self.uart = uart
+        self.batch_window = batch_window
+        self._pending: dict[int, int] = {}
+        self._issued: dict[int, float] = {}
+        self._flush_handle: TimerHandle | None = None
+        self._queue: asyncio.Queue[
+            tuple[dict[int, int], dict[int, float]]
+        ] = asyncio.Queue()
+        self._writer: asyncio.Task[None] | None = None
+        self._stopped = False
+        # writing to the serial port blocks, it gets a thread of its own
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="crownstone_uart_writer"
+        )
+        # batch statistics
+        self.packet_count = 0
+        self.command_count = 0
+        # latency from issuing a command until it was written to the USB dongle
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        """Return the average latency of the written commands in seconds."""
+        if not self.command_count:
+            return 0.0
+        return self.total_latency / self.command_count
+
+    @callback
+    def async_switch(self, crownstone_uid: int, switch_value: int) -> None:
+        """Queue a switch value (0..100 or special value) for a Crownstone."""
+        # the writer thread is shut down
+        if self._stopped:
+            return
+        self._pending[crownstone_uid] = switch_value
+        self._issued[crownstone_uid] = time.monotonic()
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(
+                self.batch_window, self.async_flush
+            )
+
+    @callback
+    def async_flush(self) -> None:
+        """Hand all queued switch values to the writer now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        switch_values = self._pending
+        issued = self._issued
+        self._pending = {}
+        self._issued = {}
+        if not switch_values:
+            return
+
+        if not self.uart.is_ready():
+            _LOGGER.warning(
+                "USB dongle is not ready, %s switch commands were not sent",
+                len(switch_values),
+            )
+            return
+
+        self._queue.put_nowait((switch_values, issued))
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._async_write_packets())
+
+    async def _async_write_packets(self) -> None:
+        """Write the queued switch values to the USB dongle, one batch at a time."""
+        while True:
+            switch_values, issued = await self._queue.get()
+            await self.hass.loop.run_in_executor(
+                self._executor, send_multi_switch, switch_values
+            )
+
+            written = time.monotonic()
+            self.packet_count += math.ceil(len(switch_values) / MULTI_SWITCH_MAX_ITEMS)
+            for issued_at in issued.values():
+                latency = written - issued_at
+                self.command_count += 1
+                self.last_latency = latency
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            _LOGGER.debug(
+                "Switched %s Crownstones via USB in %.3f seconds",
+                len(switch_values),
+                self.last_latency,
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop queued switch values and stop the writer."""
+        self._stopped = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = {}
+        self._issued = {}
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        self._executor.shutdown(wait=False)
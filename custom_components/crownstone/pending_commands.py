@@ -0,0 +1,221 @@
+"""Track switch commands until the Crownstone confirms the new state."""
+from __future__ import annotations
+
+import bisect
+from collections.abc import Callable
+from datetime import datetime
+from functools import partial
+import logging
+import time
+from typing import Any
+
+from crownstone_cloud.cloud_models.crownstones import Crownstone
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+
+from .const import CONFIRMATION_LATENCY_BUCKETS, SIG_CROWNSTONE_STATE_UPDATE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Count latencies in buckets, the last bucket counts everything above."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize the histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, latency: float) -> None:
+        """Add a latency in seconds."""
+        self.counts[bisect.bisect_left(self.buckets, latency)] += 1
+        self.count += 1
+        self.total += latency
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a dict."""
+        return {
+            "buckets": {
+                **{
+                    f"<={bucket}": count
+                    for bucket, count in zip(self.buckets, self.counts)
+                },
+                f">{self.buckets[-1]}": self.counts[-1],
+            },
+            "count": self.count,
+            "average": self.total / self.count if self.count else None,
+        }
+
+
+class PendingCommand:
+    """A switch command that was not confirmed by the Crownstone yet."""
+
+    def __init__(
+        self,
+        crownstone: Crownstone,
+        state: int,
+        previous_state: int,
+        any_on: bool,
+        resend: Callable[[], None],
+        via: str,
+        retries: int,
+    ) -> None:
+        """Initialize the pending command."""
+        self.crownstone = crownstone
+        self.state = state
+        self.previous_state = previous_state
+        # switched on without a value, the Crownstone decides the intensity
+        self.any_on = any_on
+        self.resend = resend
+        self.via = via
+        self.retries_left = retries
+        self.issued = time.monotonic()
+        self.reported_state: int | None = None
+        self.cancel_timeout: CALLBACK_TYPE | None = None
+
+    def is_confirmed_by(self, state: int) -> bool:
+        """Return True if a reported state is the result of this command."""
+        if self.any_on:
+            return state > 0
+        return state == self.state
+
+
+class PendingCommandTable:
+    """
+    Match reported switch states to the commands that were sent.
+
+    The optimistic state of a Crownstone is kept until a report confirms it.
+    Reports that don't match the command are held back,
+    when no confirmation arrives in time the command is sent again,
+    after the last retry the state is rolled back to the reported state.
+    """
+
+    def __init__(self, hass: HomeAssistant, timeout: float, retries: int) -> None:
+        """Initialize the table."""
+        self.hass = hass
+        self.timeout = timeout
+        self.retries = retries
+        self._pending: dict[str, PendingCommand] = {}
+        # confirmation statistics
+        self.histograms = {
+            via: LatencyHistogram(CONFIRMATION_LATENCY_BUCKETS)
+            for via in ("usb", "cloud")
+        }
+        self.confirmed_count = 0
+        self.held_back_count = 0
+        self.retry_count = 0
+        self.rollback_count = 0
+
+    @callback
+    def async_add(
+        self,
+        crownstone: Crownstone,
+        state: int,
+        previous_state: int,
+        any_on: bool,
+        resend: Callable[[], None],
+        via: str,
+    ) -> None:
+        """Track a command, it replaces the pending command of the Crownstone."""
+        replaced = self._pending.pop(crownstone.cloud_id, None)
+        if replaced is not None:
+            if replaced.cancel_timeout is not None:
+                replaced.cancel_timeout()
+            # the state before the first command is the state to roll back to
+            previous_state = replaced.previous_state
+
+        pending = PendingCommand(
+            crownstone, state, previous_state, any_on, resend, via, self.retries
+        )
+        self._pending[crownstone.cloud_id] = pending
+        self._async_schedule_timeout(pending)
+
+    @callback
+    def async_report(self, crownstone: Crownstone, state: int) -> bool:
+        """
+        Process a switch state reported by the USB dongle or the cloud.
+
+        Returns True if the report is held back because a command is pending.
+        """
+        pending = self._pending.get(crownstone.cloud_id)
+        if pending is None:
+            return False
+
+        if not pending.is_confirmed_by(state):
+            pending.reported_state = state
+            self.held_back_count += 1
+            return True
+
+        del self._pending[crownstone.cloud_id]
+        if pending.cancel_timeout is not None:
+            pending.cancel_timeout()
+        self.confirmed_count += 1
+        self.histograms[pending.via].observe(time.monotonic() - pending.issued)
+        return False
+
+    @callback
+    def _async_schedule_timeout(self, pending: PendingCommand) -> None:
+        """Wait for a confirmation of the command."""
+        # a callback job, so the timeout is handled in the event loop
+        pending.cancel_timeout = async_call_later(
+            self.hass, self.timeout, callback(partial(self._async_timeout, pending))
+        )
+
+    @callback
+    def _async_timeout(self, pending: PendingCommand, _: datetime) -> None:
+        """Send the command again, or roll back the state after the last retry."""
+        pending.cancel_timeout = None
+        if self._pending.get(pending.crownstone.cloud_id) is not pending:
+            return
+
+        if pending.retries_left > 0:
+            pending.retries_left -= 1
+            self.retry_count += 1
+            _LOGGER.debug(
+                "No confirmation from %s, sending the command again",
+                pending.crownstone.name,
+            )
+            pending.resend()
+            self._async_schedule_timeout(pending)
+            return
+
+        del self._pending[pending.crownstone.cloud_id]
+        self.rollback_count += 1
+        if pending.reported_state is not None:
+            rollback_state = pending.reported_state
+        else:
+            rollback_state = pending.previous_state
+        _LOGGER.warning(
+            "Switching %s was not confirmed, state is set back to %s",
+            pending.crownstone.name,
+            rollback_state,
+        )
+        pending.crownstone.state = rollback_state
+        async_dispatcher_send(
+            self.hass, SIG_CROWNSTONE_STATE_UPDATE.format(pending.crownstone.cloud_id)
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop waiting for confirmations."""
+        for pending in self._pending.values():
+            if pending.cancel_timeout is not None:
+                pending.cancel_timeout()
+        self._pending = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the table."""
+        return {
+            "pending": len(self._pending),
+            "confirmed": self.confirmed_count,
+            "held_back": self.held_back_count,
+            "retries": self.retry_count,
+            "rollbacks": self.rollback_count,
+            "confirmation_latency": {
+                via: histogram.as_dict() for via, histogram in self.histograms.items()
+            },
+        }
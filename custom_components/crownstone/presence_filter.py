@@ -0,0 +1,236 @@
+"""Drop repeated, stale and flapping Crownstone presence events."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+from functools import partial
+import logging
+import time
+from typing import Any
+
+from crownstone_sse.const import (
+    EVENT_PRESENCE_ENTER_LOCATION,
+    EVENT_PRESENCE_ENTER_SPHERE,
+    EVENT_PRESENCE_EXIT_LOCATION,
+    EVENT_PRESENCE_EXIT_SPHERE,
+)
+from crownstone_sse.events import PresenceEvent
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .helpers import PresenceIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class UserPresence:
+    """The presence of a user in a sphere, as far as events were passed on."""
+
+    def __init__(self, in_sphere: bool, location_id: str | None) -> None:
+        """Initialize the presence of a user."""
+        self.in_sphere = in_sphere
+        self.location_id = location_id
+        # locations the user exited and did not enter again
+        self.exited_locations: set[str] = set()
+        self.location_changed = 0.0
+        self.last_event: tuple[str, str | None] | None = None
+        self.last_event_time = 0.0
+        # location change that waits for the hysteresis to pass
+        self.held_event: dict[str, Any] | None = None
+        self.cancel_held_event: CALLBACK_TYPE | None = None
+
+
+class PresenceEventFilter:
+    """
+    Filter presence events before they change the state or reach the event bus.
+
+    Events are sequenced per user:
+    - an event identical to the previous event of the user within the dedupe window is dropped,
+    - an event that does not change the presence of the user is dropped as stale,
+    - a location change shortly after the previous one is held for the hysteresis time,
+      if the user goes back to the previous location in that time both are dropped.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        presence_index: PresenceIndex,
+        dedupe_window: float,
+        hysteresis: float,
+        publish: Callable[[dict[str, Any]], None],
+    ) -> None:
+        """Initialize the filter."""
+        self.hass = hass
+        self.presence_index = presence_index
+        self.dedupe_window = dedupe_window
+        self.hysteresis = hysteresis
+        self.publish = publish
+        self._users: dict[tuple[str, str], UserPresence] = {}
+        # filter statistics
+        self.received_count = 0
+        self.published_count = 0
+        self.duplicate_count = 0
+        self.stale_count = 0
+        self.flapping_count = 0
+        self.held_count = 0
+
+    def _get_user(self, sphere_id: str, user_id: str) -> UserPresence:
+        """Return the presence of a user, starting from the current presence."""
+        user = self._users.get((sphere_id, user_id))
+        if user is None:
+            location = self.presence_index.user_locations.get((sphere_id, user_id))
+            user = UserPresence(
+                user_id in self.presence_index.sphere_users.get(sphere_id, set()),
+                None if location is None else location.cloud_id,
+            )
+            self._users[(sphere_id, user_id)] = user
+        return user
+
+    @callback
+    def async_process(self, event: PresenceEvent) -> None:
+        """Pass a presence event on, hold it back or drop it."""
+        self.received_count += 1
+        event_data = event.data
+        sub_type = event.sub_type
+        location_id = (
+            event.location_id
+            if sub_type in (EVENT_PRESENCE_ENTER_LOCATION, EVENT_PRESENCE_EXIT_LOCATION)
+            else None
+        )
+        user = self._get_user(event.sphere_id, event.user_id)
+
+        now = time.monotonic()
+        if (
+            user.last_event == (sub_type, location_id)
+            and now - user.last_event_time < self.dedupe_window
+        ):
+            self.duplicate_count += 1
+            return
+        user.last_event = (sub_type, location_id)
+        user.last_event_time = now
+
+        if sub_type == EVENT_PRESENCE_ENTER_LOCATION:
+            self._process_enter_location(user, event_data, location_id, now)
+            return
+
+        if sub_type == EVENT_PRESENCE_EXIT_LOCATION:
+            if location_id in user.exited_locations:
+                self.stale_count += 1
+                return
+            user.exited_locations.add(location_id)
+        elif sub_type == EVENT_PRESENCE_ENTER_SPHERE:
+            if user.in_sphere:
+                self.stale_count += 1
+                return
+            user.in_sphere = True
+        elif sub_type == EVENT_PRESENCE_EXIT_SPHERE:
+            if not user.in_sphere and user.location_id is None:
+                self.stale_count += 1
+                return
+            # leaving the sphere overrules a held location change
+            self._drop_held_event(user)
+            user.in_sphere = False
+            user.location_id = None
+
+        self._publish(event_data)
+
+    def _process_enter_location(
+        self,
+        user: UserPresence,
+        event_data: dict[str, Any],
+        location_id: str | None,
+        now: float,
+    ) -> None:
+        """Pass a location change on, unless the user is flapping between locations."""
+        if user.held_event is not None:
+            if location_id == user.location_id:
+                # back to the location before the held change
+                self._drop_held_event(user)
+                self.flapping_count += 2
+                return
+            # the latest location replaces the held change
+            user.held_event = event_data
+            self.flapping_count += 1
+            return
+
+        if location_id == user.location_id:
+            self.stale_count += 1
+            return
+
+        if now - user.location_changed < self.hysteresis:
+            self.held_count += 1
+            user.held_event = event_data
+            user.cancel_held_event = async_call_later(
+                self.hass,
+                self.hysteresis - (now - user.location_changed),
+                # a callback job, so the event is released in the event loop
+                callback(partial(self._release_held_event, user)),
+            )
+            return
+
+        self._apply_enter_location(user, event_data, location_id, now)
+
+    def _apply_enter_location(
+        self,
+        user: UserPresence,
+        event_data: dict[str, Any],
+        location_id: str | None,
+        now: float,
+    ) -> None:
+        """Move the user to a location and pass the event on."""
+        user.location_id = location_id
+        user.location_changed = now
+        user.in_sphere = True
+        user.exited_locations.discard(location_id)
+        self._publish(event_data)
+
+    @callback
+    def _release_held_event(self, user: UserPresence, _: datetime) -> None:
+        """Pass on the location change that waited for the hysteresis."""
+        user.cancel_held_event = None
+        event_data = user.held_event
+        user.held_event = None
+        if event_data is None:
+            return
+
+        location_id = PresenceEvent(event_data).location_id
+        if location_id == user.location_id:
+            self.stale_count += 1
+            return
+        self._apply_enter_location(user, event_data, location_id, time.monotonic())
+
+    def _drop_held_event(self, user: UserPresence) -> None:
+        """Forget the held location change of a user."""
+        if user.cancel_held_event is not None:
+            user.cancel_held_event()
+            user.cancel_held_event = None
+        user.held_event = None
+
+    def _publish(self, event_data: dict[str, Any]) -> None:
+        """Pass an event on to the presence state and device triggers."""
+        self.published_count += 1
+        self.publish(event_data)
+
+    @callback
+    def async_reset(self) -> None:
+        """Start from the current presence again, after it was synced with the cloud."""
+        self.async_stop()
+        self._users = {}
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the held location changes."""
+        for user in self._users.values():
+            self._drop_held_event(user)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the filter."""
+        return {
+            "received": self.received_count,
+            "published": self.published_count,
+            "dropped_duplicate": self.duplicate_count,
+            "dropped_stale": self.stale_count,
+            "dropped_flapping": self.flapping_count,
+            "held": self.held_count,
+        }
@@ -1,8 +1,9 @@
 """Support for Crownstone sensor entities."""
 from __future__ import annotations
 
-from collections.abc import Mapping
+from datetime import datetime, timedelta
 from functools import partial
+import time
 from typing import TYPE_CHECKING, Any
 
 from crownstone_cloud.cloud_models.crownstones import Crownstone
@@ -17,22 +18,33 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ENERGY_KILO_WATT_HOUR, POWER_WATT, STATE_UNAVAILABLE
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import ENERGY_KILO_WATT_HOUR, POWER_WATT, TIME_SECONDS
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
 from homeassistant.helpers.typing import StateType
 
 from .const import (
+    CONF_POWER_DEADBAND,
+    CONF_POWER_DEADBAND_PERCENT,
+    CONF_POWER_MAX_INTERVAL,
+    CONF_POWER_MIN_INTERVAL,
     CONNECTION_NAME_SUFFIX,
     CONNECTION_SUFFIX,
     CONNECTIONS,
     CROWNSTONE_INCLUDE_TYPES,
+    DEFAULT_POWER_DEADBAND,
+    DEFAULT_POWER_DEADBAND_PERCENT,
+    DEFAULT_POWER_MAX_INTERVAL,
+    DEFAULT_POWER_MIN_INTERVAL,
     DOMAIN,
     ENERGY_USAGE_NAME_SUFFIX,
     ENERGY_USAGE_SUFFIX,
     JOULE_TO_KWH,
+    LEGACY_ENERGY_PRECISION,
     POWER_USAGE_NAME_SUFFIX,
     POWER_USAGE_SUFFIX,
     PRESENCE_LOCATION,
@@ -42,17 +54,25 @@ from .const import (
     PRESENCE_SUFFIX,
     SIG_ADD_CROWNSTONE_DEVICES,
     SIG_ADD_PRESENCE_DEVICES,
+    SIG_ADD_SPHERE_DEVICES,
     SIG_ENERGY_STATE_UPDATE,
     SIG_POWER_STATE_UPDATE,
     SIG_PRESENCE_STATE_UPDATE,
+    SIG_PRESENCE_UPDATE,
     SIG_SSE_STATE_CHANGE,
     SIG_UART_STATE_CHANGE,
+    SIG_USB_SETUP_DONE,
+    SIG_USER_DATA_UPDATE,
+    SSE_HEALTH_SENSORS,
 )
 from .devices import CrownstoneBaseEntity, PresenceBaseEntity
 
 if TYPE_CHECKING:
     from .entry_manager import CrownstoneEntryManager
 
+# only the SSE health sensors are polled, the age and downtime keep counting
+SCAN_INTERVAL = timedelta(seconds=30)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -62,7 +82,9 @@ async def async_setup_entry(
     """Set up sensors from a config entry."""
     manager: CrownstoneEntryManager = hass.data[DOMAIN][config_entry.entry_id]
 
-    entities: list[Connection | Presence | PowerUsage | EnergyUsage] = []
+    entities: list[Connection | Presence | PowerUsage | EnergyUsage | SSEHealth] = [
+        SSEHealth(manager, key) for key in SSE_HEALTH_SENSORS
+    ]
 
     # Add sphere & location presence entities
     for sphere in manager.cloud.cloud_data:
@@ -86,19 +108,24 @@ async def async_setup_entry(
                 )
             )
 
-    # add power usage & energy usage entities
+    # add connection entities, power & energy usage is added when the USB is set up
     for sphere in manager.cloud.cloud_data:
         for crownstone in sphere.crownstones:
             if crownstone.type not in CROWNSTONE_INCLUDE_TYPES:
                 continue
-            if manager.uart and sphere.cloud_id == manager.usb_sphere_id:
-                entities.append(Connection(crownstone, manager.uart))
-                entities.append(PowerUsage(crownstone, manager.uart))
-                entities.append(EnergyUsage(crownstone, manager.uart))
+            if sphere.cloud_id == manager.usb_sphere_id:
+                entities.append(Connection(crownstone, manager))
             else:
                 entities.append(Connection(crownstone))
 
     # add callbacks for new devices
+    manager.config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIG_USB_SETUP_DONE.format(config_entry.entry_id),
+            partial(async_add_power_energy_entities, async_add_entities, manager),
+        )
+    )
     manager.config_entry.async_on_unload(
         async_dispatcher_connect(
             hass,
@@ -113,6 +140,32 @@ async def async_setup_entry(
             partial(async_add_presence_location_entities, async_add_entities, manager),
         )
     )
+    manager.config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIG_ADD_SPHERE_DEVICES,
+            partial(async_add_presence_sphere_entities, async_add_entities, manager),
+        )
+    )
+
+    async_add_entities(entities)
+
+
+@callback
+def async_add_power_energy_entities(
+    async_add_entities: AddEntitiesCallback, manager: CrownstoneEntryManager
+) -> None:
+    """Add power and energy usage entities when the USB dongle is set up."""
+    usb_sphere = manager.cloud.cloud_data.find_by_id(manager.usb_sphere_id)
+    if usb_sphere is None:
+        return
+
+    entities: list[PowerUsage | EnergyUsage] = []
+    for crownstone in usb_sphere.crownstones:
+        if crownstone.type not in CROWNSTONE_INCLUDE_TYPES:
+            continue
+        entities.append(PowerUsage(crownstone, manager))
+        entities.append(EnergyUsage(crownstone, manager))
 
     async_add_entities(entities)
 
@@ -131,9 +184,11 @@ def async_add_conn_power_energy_entities(
         if crownstone.type not in CROWNSTONE_INCLUDE_TYPES:
             continue
         if sphere_id == manager.usb_sphere_id:
-            entities.append(Connection(crownstone, manager.uart))
-            entities.append(PowerUsage(crownstone, manager.uart))
-            entities.append(EnergyUsage(crownstone, manager.uart))
+            entities.append(Connection(crownstone, manager))
+            # until the USB is set up, they are added with the other Crownstones
+            if manager.usb_setup_done:
+                entities.append(PowerUsage(crownstone, manager))
+                entities.append(EnergyUsage(crownstone, manager))
         else:
             entities.append(Connection(crownstone))
 
@@ -164,41 +219,157 @@ def async_add_presence_location_entities(
     async_add_entities(entities)
 
 
+@callback
+def async_add_presence_sphere_entities(
+    async_add_entities: AddEntitiesCallback,
+    manager: CrownstoneEntryManager,
+    spheres: list[Sphere],
+) -> None:
+    """Add presence entity to a new Sphere device."""
+    entities: list[Presence] = []
+
+    for sphere in spheres:
+        entities.append(
+            Presence(
+                manager,
+                sphere,
+                PRESENCE_SPHERE,
+                PRESENCE_SPHERE_ICON,
+                sphere.cloud_id,
+            )
+        )
+
+    async_add_entities(entities)
+
+
 class PowerUsage(CrownstoneBaseEntity, SensorEntity):
     """
     Representation of a power usage sensor.
 
     The state of this sensor is updated using local push events from a Crownstone USB.
+    Small changes within the deadband are only written after the max write interval,
+    and writes are never done more often than the min write interval.
     """
 
     _attr_device_class = SensorDeviceClass.POWER
     _attr_native_unit_of_measurement = POWER_WATT
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, crownstone_data: Crownstone, usb: CrownstoneUart) -> None:
+    def __init__(
+        self, crownstone_data: Crownstone, entry_manager: CrownstoneEntryManager
+    ) -> None:
         """Initialize the power usage entity."""
         super().__init__(crownstone_data)
-        self.usb = usb
+        self.manager = entry_manager
+        options = entry_manager.config_entry.options
+        self.deadband: int = options.get(CONF_POWER_DEADBAND, DEFAULT_POWER_DEADBAND)
+        self.deadband_percent: int = options.get(
+            CONF_POWER_DEADBAND_PERCENT, DEFAULT_POWER_DEADBAND_PERCENT
+        )
+        self.min_interval: int = options.get(
+            CONF_POWER_MIN_INTERVAL, DEFAULT_POWER_MIN_INTERVAL
+        )
+        self.max_interval: int = max(
+            options.get(CONF_POWER_MAX_INTERVAL, DEFAULT_POWER_MAX_INTERVAL),
+            self.min_interval,
+        )
+        self._last_write: float | None = None
+        self._scheduled_write: float | None = None
+        self._unsub_scheduled_write: CALLBACK_TYPE | None = None
         # Entity class attributes
         self._attr_name = f"{self.device.name} {POWER_USAGE_NAME_SUFFIX}"
         self._attr_unique_id = f"{self.cloud_id}-{POWER_USAGE_SUFFIX}"
+        self._attr_native_value = int(self.device.power_usage)
+
+    @property
+    def usb(self) -> CrownstoneUart | None:
+        """Return the USB dongle, None when its setup failed."""
+        return self.manager.uart
 
     @property
     def available(self) -> bool:
         """Return if there is an active connection with a Crownstone USB."""
         return self.usb is not None and self.usb.is_ready()
 
-    @property
-    def native_value(self) -> StateType:
-        """Return the current value of power usage for this device."""
-        return int(self.device.power_usage)
+    def _is_significant(self, power_usage: int) -> bool:
+        """Return if a new power usage is outside the deadband of the written value."""
+        written_value = self._attr_native_value
+        if not isinstance(written_value, int):
+            return True
+
+        delta = abs(power_usage - written_value)
+        if delta <= self.deadband:
+            return False
+        if written_value != 0 and delta * 100 <= self.deadband_percent * abs(
+            written_value
+        ):
+            return False
+
+        return True
+
+    @callback
+    def async_update_power_usage(self) -> None:
+        """Write a new power usage, limited by the deadband and write intervals."""
+        if self._last_write is None:
+            self._async_write_power_usage()
+            return
+
+        elapsed = time.monotonic() - self._last_write
+        if not self._is_significant(int(self.device.power_usage)):
+            # heartbeat, small changes are written after the max interval
+            self._async_schedule_write(self.max_interval - elapsed)
+        elif elapsed < self.min_interval:
+            self._async_schedule_write(self.min_interval - elapsed)
+        else:
+            self._async_write_power_usage()
+
+    @callback
+    def _async_schedule_write(self, delay: float) -> None:
+        """Schedule a write of the latest power usage, unless one is due earlier."""
+        if delay <= 0:
+            self._async_write_power_usage()
+            return
+
+        due = time.monotonic() + delay
+        if self._scheduled_write is not None and self._scheduled_write <= due:
+            return
+
+        self._async_cancel_scheduled_write()
+        self._scheduled_write = due
+        self._unsub_scheduled_write = async_call_later(
+            self.hass, delay, self._async_scheduled_write
+        )
+
+    @callback
+    def _async_scheduled_write(self, _: datetime) -> None:
+        """Write the latest power usage when a scheduled write is due."""
+        self._unsub_scheduled_write = None
+        self._async_write_power_usage()
+
+    @callback
+    def _async_cancel_scheduled_write(self) -> None:
+        """Cancel a scheduled write."""
+        if self._unsub_scheduled_write is not None:
+            self._unsub_scheduled_write()
+            self._unsub_scheduled_write = None
+        self._scheduled_write = None
+
+    @callback
+    def _async_write_power_usage(self) -> None:
+        """Write the latest power usage to the state machine."""
+        self._async_cancel_scheduled_write()
+        self._last_write = time.monotonic()
+        self._attr_native_value = int(self.device.power_usage)
+        self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         """Set up listeners when this entity is added to HA."""
         # new state received
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, SIG_POWER_STATE_UPDATE, self.async_write_ha_state
+                self.hass,
+                SIG_POWER_STATE_UPDATE.format(self.cloud_id),
+                self.async_update_power_usage,
             )
         )
         # updates availability when usb connects/disconnects
@@ -207,6 +378,74 @@ class PowerUsage(CrownstoneBaseEntity, SensorEntity):
                 self.hass, SIG_UART_STATE_CHANGE, self.async_write_ha_state
             )
         )
+        self.async_on_remove(self._async_cancel_scheduled_write)
+
+
+class EnergyAccumulator(ExtraStoredData):
+    """
+    Accumulate the energy usage of a Crownstone over resets of its energy counter.
+
+    A Crownstone resets its counter to 0 when it reboots (power loss, reset or update).
+    The last counter value is added to the offset when that happens,
+    so the total keeps increasing.
+    """
+
+    def __init__(
+        self,
+        offset: int = 0,
+        last_counter: int | None = None,
+        baseline: int | None = None,
+    ) -> None:
+        """Initialize the accumulator."""
+        self.offset = offset
+        self.last_counter = last_counter
+        # total restored from a state without accumulator, until the first counter
+        self.baseline = baseline
+
+    @property
+    def total(self) -> int | None:
+        """Return the total energy usage in joule."""
+        if self.last_counter is None:
+            return self.baseline
+        return self.offset + self.last_counter
+
+    def update(self, counter: int) -> None:
+        """Process a new counter value from the Crownstone."""
+        if self.last_counter is None:
+            # the baseline is rounded, a counter just below it continues it
+            if (
+                self.baseline is not None
+                and counter < self.baseline - LEGACY_ENERGY_PRECISION
+            ):
+                self.offset += self.baseline
+            self.baseline = None
+        elif counter < self.last_counter:
+            self.offset += self.last_counter
+        self.last_counter = counter
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a dict representation of the accumulator."""
+        return {
+            "offset": self.offset,
+            "last_counter": self.last_counter,
+            "baseline": self.baseline,
+        }
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> EnergyAccumulator | None:
+        """Initialize a stored accumulator."""
+        try:
+            offset = int(restored["offset"])
+            last_counter = restored["last_counter"]
+            if last_counter is not None:
+                last_counter = int(last_counter)
+            baseline = restored.get("baseline")
+            if baseline is not None:
+                baseline = int(baseline)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        return cls(offset, last_counter, baseline)
 
 
 class EnergyUsage(CrownstoneBaseEntity, SensorEntity, RestoreEntity):
@@ -220,40 +459,80 @@ class EnergyUsage(CrownstoneBaseEntity, SensorEntity, RestoreEntity):
     _attr_native_unit_of_measurement = ENERGY_KILO_WATT_HOUR
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
 
-    def __init__(self, crownstone_data: Crownstone, usb: CrownstoneUart) -> None:
+    def __init__(
+        self, crownstone_data: Crownstone, entry_manager: CrownstoneEntryManager
+    ) -> None:
         """Initialize the energy usage entity."""
         super().__init__(crownstone_data)
-        self.usb = usb
+        self.manager = entry_manager
+        self.accumulator = EnergyAccumulator()
         # Entity class attributes
         self._attr_name = f"{self.device.name} {ENERGY_USAGE_NAME_SUFFIX}"
         self._attr_unique_id = f"{self.cloud_id}-{ENERGY_USAGE_SUFFIX}"
 
+    @property
+    def usb(self) -> CrownstoneUart | None:
+        """Return the USB dongle, None when its setup failed."""
+        return self.manager.uart
+
     @property
     def available(self) -> bool:
         """Return if there is an active connection with a Crownstone USB."""
         return self.usb is not None and self.usb.is_ready()
 
     @property
-    def native_value(self) -> StateType:
-        """Return the current value of accumulated energy."""
-        # calculate energy usage in kilowatt per hour
-        energy_joule = self.device.energy_usage
-        energy_wh: float = energy_joule / JOULE_TO_KWH
-
-        return round(energy_wh, 2)
+    def extra_restore_state_data(self) -> EnergyAccumulator:
+        """Return the accumulator, to keep the offset over restarts."""
+        return self.accumulator
+
+    @callback
+    def async_update_energy_usage(self) -> None:
+        """Write the energy usage when the rounded value in kWh changed."""
+        self.accumulator.update(int(self.device.energy_usage))
+        if self._async_update_native_value():
+            self.async_write_ha_state()
+
+    @callback
+    def _async_update_native_value(self) -> bool:
+        """Calculate the energy usage in kWh, return True if it changed."""
+        energy_joule = self.accumulator.total
+        if energy_joule is None:
+            return False
+
+        energy_kwh = round(energy_joule / JOULE_TO_KWH, 2)
+        if energy_kwh == self._attr_native_value:
+            return False
+
+        self._attr_native_value = energy_kwh
+        return True
 
     async def async_added_to_hass(self) -> None:
         """Set up listeners when this entity is added to HA."""
-        # Restore last state immediately otherwise the state will be 0
+        # Restore the accumulator immediately otherwise the state will be unknown
         # until the USB dongle sends an update which can take a minute.
-        last_state = await self.async_get_last_state()
-        if last_state is not None and last_state.state != STATE_UNAVAILABLE:
-            self.device.energy_usage = int(float(last_state.state) * JOULE_TO_KWH)
+        last_extra_data = await self.async_get_last_extra_data()
+        if last_extra_data is not None:
+            accumulator = EnergyAccumulator.from_dict(last_extra_data.as_dict())
+            if accumulator is not None:
+                self.accumulator = accumulator
+        else:
+            # state written before the accumulator was used, a rounded counter in kWh
+            last_state = await self.async_get_last_state()
+            if last_state is not None:
+                try:
+                    self.accumulator.baseline = int(
+                        float(last_state.state) * JOULE_TO_KWH
+                    )
+                except ValueError:
+                    pass
+        self._async_update_native_value()
 
         # new state received
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, SIG_ENERGY_STATE_UPDATE, self.async_write_ha_state
+                self.hass,
+                SIG_ENERGY_STATE_UPDATE.format(self.cloud_id),
+                self.async_update_energy_usage,
             )
         )
         # updates availability when usb connects/disconnects
@@ -290,42 +569,69 @@ class Presence(PresenceBaseEntity):
         self._attr_name = location_or_sphere_data.name
         self._attr_icon = icon
         self._attr_unique_id = f"{self.cloud_id}-{PRESENCE_SUFFIX}"
+        # people the state and attributes were rendered for
+        self._rendered_people: tuple[str, ...] | None = None
 
     @property
     def available(self) -> bool:
         """Return if the connection to sse server is still open."""
-        return bool(self.manager.sse.is_available)
+        return self.manager.sse is not None and self.manager.sse.is_available
 
-    @property
-    def state(self) -> StateType:
-        """Return the state of the presence sensor."""
+    @callback
+    def _async_render_presence(self) -> None:
+        """Render the state and attributes for the people present on location."""
+        sphere = self.manager.cloud.cloud_data.find_by_id(self.sphere_id)
         present_people: list[str] = []
-        # Get the first name of the people present on location
+        attributes: dict[str, Any] = {}
         for user_id in self.location_or_sphere.present_people:
-            sphere = self.manager.cloud.cloud_data.find_by_id(self.sphere_id)
-            user = sphere.users.find_by_id(user_id)
+            user = None if sphere is None else sphere.users.find_by_id(user_id)
+            if user is None:
+                continue
+            # first name in the state, last name and role in the attributes
             present_people.append(user.first_name)
+            attributes[user.first_name] = (user.last_name, user.role)
 
-        return ", ".join(present_people)
+        self._rendered_people = tuple(self.location_or_sphere.present_people)
+        self._attr_state = ", ".join(present_people)
+        self._attr_extra_state_attributes = attributes
 
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return extra info for the people present on location."""
-        attributes: dict[str, Any] = {}
-        # Get the last name and role of the people present on location
-        for user_id in self.location_or_sphere.present_people:
-            sphere = self.manager.cloud.cloud_data.find_by_id(self.sphere_id)
-            user = sphere.users.find_by_id(user_id)
-            attributes[user.first_name] = (user.last_name, user.role)
+    @callback
+    def _async_update_presence(self) -> None:
+        """Render and write the state, only if the people present changed."""
+        if self._rendered_people == tuple(self.location_or_sphere.present_people):
+            return
+        self._async_render_presence()
+        self.async_write_ha_state()
 
-        return attributes
+    @callback
+    def _async_update_user_data(self) -> None:
+        """Render and write the state again, names or roles may have changed."""
+        self._async_render_presence()
+        self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         """Set up listeners when this entity is added to HA."""
-        # new state received
+        self._async_render_presence()
+        # presence replaced with the presence from the cloud
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, SIG_PRESENCE_STATE_UPDATE, self.async_write_ha_state
+                self.hass, SIG_PRESENCE_STATE_UPDATE, self._async_update_presence
+            )
+        )
+        # presence in this sphere or location changed
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIG_PRESENCE_UPDATE.format(self.cloud_id),
+                self._async_update_presence,
+            )
+        )
+        # user data of the sphere updated
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIG_USER_DATA_UPDATE.format(self.sphere_id),
+                self._async_update_user_data,
             )
         )
         # updates availability on sse state change
@@ -343,15 +649,24 @@ class Connection(CrownstoneBaseEntity):
     _attr_icon = "mdi:signal-variant"
 
     def __init__(
-        self, crownstone_data: Crownstone, usb: CrownstoneUart | None = None
+        self,
+        crownstone_data: Crownstone,
+        entry_manager: CrownstoneEntryManager | None = None,
     ) -> None:
-        """Initialize connection entity."""
+        """Initialize connection entity, with the manager for the USB sphere."""
         super().__init__(crownstone_data)
-        self.usb = usb
+        self.manager = entry_manager
         # Entity class attributes
         self._attr_name = f"{self.device.name} {CONNECTION_NAME_SUFFIX}"
         self._attr_unique_id = f"{self.cloud_id}-{CONNECTION_SUFFIX}"
 
+    @property
+    def usb(self) -> CrownstoneUart | None:
+        """Return the USB dongle, None outside its sphere or when its setup failed."""
+        if self.manager is None:
+            return None
+        return self.manager.uart
+
     @property
     def state(self) -> StateType:
         """Return if the binary sensor is on."""
@@ -364,3 +679,50 @@ class Connection(CrownstoneBaseEntity):
                 self.hass, SIG_UART_STATE_CHANGE, self.async_write_ha_state
             )
         )
+
+
+class SSEHealth(SensorEntity):
+    """
+    Representation of a health metric of the Crownstone SSE stream.
+
+    Reconnect count, age of the last event or ping, and total downtime in seconds.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, entry_manager: CrownstoneEntryManager, key: str) -> None:
+        """Initialize the SSE health entity."""
+        self.manager = entry_manager
+        self.key = key
+        # Entity class attributes
+        self._attr_name = SSE_HEALTH_SENSORS[key]
+        self._attr_unique_id = f"{entry_manager.config_entry.entry_id}-{key}"
+        if key == "sse_reconnects":
+            self._attr_icon = "mdi:connection"
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        else:
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = TIME_SECONDS
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the metric of the stream."""
+        sse = self.manager.sse
+        if sse is None:
+            return None
+        if self.key == "sse_reconnects":
+            return sse.reconnect_count
+        if self.key == "sse_last_event_age":
+            last_event_age = sse.last_event_age
+            return None if last_event_age is None else round(last_event_age)
+        return round(sse.downtime)
+
+    async def async_added_to_hass(self) -> None:
+        """Set up listeners when this entity is added to HA."""
+        # write the metrics when the stream connects or disconnects
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIG_SSE_STATE_CHANGE, self.async_write_ha_state
+            )
+        )
@@ -0,0 +1,171 @@
+"""Keep the stream of Crownstone SSE events running."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import random
+import time
+from typing import Any
+
+from crownstone_sse import CrownstoneSSEAsync
+from crownstone_sse.const import EVENT_PING
+from crownstone_sse.events import Event
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import SIG_SSE_STATE_CHANGE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SSESupervisor:
+    """
+    Run the SSE client in a task and restart it when the stream ends or stalls.
+
+    The server sends a ping every 30 seconds, when no event or ping arrives
+    within the heartbeat timeout the stream is considered stalled.
+    A new client is connected after a delay that doubles with every failed attempt,
+    with jitter so many installations don't reconnect at the same time.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        create_client: Callable[[], CrownstoneSSEAsync],
+        process_event: Callable[[Event], None],
+        heartbeat_timeout: float,
+        reconnect_delay: float,
+        max_reconnect_delay: float,
+    ) -> None:
+        """Initialize the supervisor."""
+        self.hass = hass
+        self.create_client = create_client
+        self.process_event = process_event
+        self.heartbeat_timeout = heartbeat_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.client: CrownstoneSSEAsync | None = None
+        self.connected = False
+        self._task: asyncio.Task[None] | None = None
+        # stream health statistics
+        self.connect_duration: float | None = None
+        self.reconnect_count = 0
+        self.stall_count = 0
+        self.last_event: float | None = None
+        self.total_downtime = 0.0
+        self._disconnected_since: float | None = time.monotonic()
+
+    @property
+    def is_available(self) -> bool:
+        """Return if the stream is connected."""
+        return self.connected and self.client is not None and self.client.is_available
+
+    @property
+    def last_event_age(self) -> float | None:
+        """Return the seconds since the last event or ping."""
+        if self.last_event is None:
+            return None
+        return time.monotonic() - self.last_event
+
+    @property
+    def downtime(self) -> float:
+        """Return the seconds the stream was not connected."""
+        if self._disconnected_since is None:
+            return self.total_downtime
+        return self.total_downtime + time.monotonic() - self._disconnected_since
+
+    @callback
+    def async_start(self) -> None:
+        """Start the stream, not a hass task because it runs until unloaded."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._async_run())
+
+    async def _async_run(self) -> None:
+        """Connect a client, and a new client each time the stream is lost."""
+        failed_attempts = 0
+        # the task is forgotten when the supervisor is stopped
+        while self._task is not None:
+            client = self.create_client()
+            self.client = client
+            received_event = self.last_event
+            try:
+                await self._async_stream(client)
+            except asyncio.TimeoutError:
+                self.stall_count += 1
+                _LOGGER.warning(
+                    "No events from the Crownstone SSE server for %s seconds",
+                    self.heartbeat_timeout,
+                )
+            except StopAsyncIteration:
+                _LOGGER.warning("Crownstone SSE stream was closed")
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Crownstone SSE stream failed: %s", err)
+            finally:
+                self._async_set_connected(False)
+
+            # a stream that delivered events starts the backoff over
+            if self.last_event != received_event:
+                failed_attempts = 0
+            delay = min(
+                self.reconnect_delay * 2**failed_attempts, self.max_reconnect_delay
+            ) * random.uniform(0.5, 1.5)
+            failed_attempts += 1
+            _LOGGER.debug("Reconnecting to the Crownstone SSE server in %.1f s", delay)
+            await asyncio.sleep(delay)
+            self.reconnect_count += 1
+
+    async def _async_stream(self, client: CrownstoneSSEAsync) -> None:
+        """Pass events on until the stream ends or no heartbeat arrives in time."""
+        start = time.monotonic()
+        # the client retries a failed connection itself, limit how long it takes
+        await asyncio.wait_for(client.__aenter__(), self.heartbeat_timeout)
+        try:
+            self.connect_duration = round(time.monotonic() - start, 3)
+            _LOGGER.debug(
+                "Crownstone SSE client connected in %s seconds", self.connect_duration
+            )
+            self._async_set_connected(True)
+            while True:
+                event: Any = await asyncio.wait_for(
+                    client.__anext__(), self.heartbeat_timeout
+                )
+                self.last_event = time.monotonic()
+                if event is not None and event.type != EVENT_PING:
+                    self.process_event(event)
+        finally:
+            await client.__aexit__()
+
+    @callback
+    def _async_set_connected(self, connected: bool) -> None:
+        """Update the downtime and the availability of entities that use the stream."""
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if connected:
+            if self._disconnected_since is not None:
+                self.total_downtime += time.monotonic() - self._disconnected_since
+            self._disconnected_since = None
+        else:
+            self._disconnected_since = time.monotonic()
+        async_dispatcher_send(self.hass, SIG_SSE_STATE_CHANGE)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the stream."""
+        if self._task is not None:
+            # closes the connection of the running client
+            self._task.cancel()
+            self._task = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the stream."""
+        return {
+            "connected": self.is_available,
+            "connect_duration": self.connect_duration,
+            "reconnects": self.reconnect_count,
+            "stalls": self.stall_count,
+            "last_event_age": self.last_event_age,
+            "downtime": round(self.downtime, 3),
+        }
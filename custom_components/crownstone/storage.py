@@ -0,0 +1,110 @@
+"""Persistent snapshot of the Crownstone cloud data."""
+from __future__ import annotations
+
+from typing import Any
+
+from crownstone_cloud import CrownstoneCloud
+from crownstone_cloud.cloud_models.crownstones import Crownstone
+from crownstone_cloud.cloud_models.locations import Location
+from crownstone_cloud.cloud_models.spheres import Sphere, Spheres
+from crownstone_cloud.cloud_models.users import User
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+
+def snapshot_cloud_data(cloud_data: Spheres) -> dict[str, Any]:
+    """Return the synced cloud data as a dict that can be stored."""
+    return {
+        "user_id": cloud_data.user_id,
+        "spheres": [
+            {
+                "data": sphere.data,
+                "present_people": sphere.present_people,
+                "crownstones": [crownstone.data for crownstone in sphere.crownstones],
+                "locations": [
+                    {"data": location.data, "present_people": location.present_people}
+                    for location in sphere.locations
+                ],
+                "users": [
+                    {"data": user.data, "role": user.role} for user in sphere.users
+                ],
+            }
+            for sphere in cloud_data
+        ],
+    }
+
+
+def restore_cloud_data(cloud: CrownstoneCloud, snapshot: dict[str, Any]) -> Spheres:
+    """Create the cloud data objects from a stored snapshot."""
+    user_id: str = snapshot["user_id"]
+    cloud_data = Spheres(cloud, user_id)
+
+    for sphere_snapshot in snapshot["spheres"]:
+        sphere = Sphere(cloud, sphere_snapshot["data"], user_id)
+        sphere.present_people = sphere_snapshot["present_people"]
+
+        for crownstone_data in sphere_snapshot["crownstones"]:
+            crownstone = Crownstone(cloud, crownstone_data)
+            # Crownstones added by an SSE event are stored without abilities
+            if "abilities" in crownstone_data:
+                crownstone.update_abilities()
+            sphere.crownstones.data[crownstone.cloud_id] = crownstone
+
+        for location_snapshot in sphere_snapshot["locations"]:
+            location = Location(location_snapshot["data"])
+            location.present_people = location_snapshot["present_people"]
+            sphere.locations.data[location.cloud_id] = location
+
+        for user_snapshot in sphere_snapshot["users"]:
+            user = User(user_snapshot["data"], user_snapshot["role"])
+            sphere.users.data[user.cloud_id] = user
+
+        cloud_data.data[sphere.cloud_id] = sphere
+
+    return cloud_data
+
+
+class CloudDataStore:
+    """Store a snapshot of the cloud data of a config entry on disk."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+    async def async_load(self, cloud: CrownstoneCloud) -> bool:
+        """
+        Load the stored cloud data into the cloud instance.
+
+        Returns True if a snapshot was available.
+        """
+        snapshot: dict[str, Any] | None = await self._store.async_load()
+        if snapshot is None:
+            return False
+
+        try:
+            cloud.cloud_data = restore_cloud_data(cloud, snapshot)
+        except (KeyError, TypeError):
+            return False
+
+        return True
+
+    async def async_save(self, cloud: CrownstoneCloud) -> None:
+        """Save a snapshot of the cloud data."""
+        await self._store.async_save(snapshot_cloud_data(cloud.cloud_data))
+
+    @callback
+    def async_delay_save(self, cloud: CrownstoneCloud) -> None:
+        """Save a snapshot of the cloud data, delayed to group changes."""
+        self._store.async_delay_save(
+            lambda: snapshot_cloud_data(cloud.cloud_data), SAVE_DELAY
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the stored snapshot."""
+        await self._store.async_remove()
@@ -0,0 +1,134 @@
+"""Route Crownstone presence events to the device triggers that match them."""
+from __future__ import annotations
+
+from typing import Any
+
+from crownstone_sse.const import (
+    EVENT_PRESENCE,
+    EVENT_PRESENCE_ENTER_LOCATION,
+    EVENT_PRESENCE_EXIT_LOCATION,
+)
+from crownstone_sse.events import PresenceEvent
+
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Context,
+    Event,
+    HassJob,
+    HomeAssistant,
+    callback,
+)
+
+from .const import DATA_TRIGGER_ROUTER, DOMAIN
+
+
+class PresenceTriggerRouter:
+    """
+    Index attached presence triggers by sphere, location, sub type and user.
+
+    An event is matched with two lookups, one for its user and one for any user,
+    the actions of the matching triggers are run directly.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the router."""
+        self.hass = hass
+        # sphere id, location id (None for the sphere), sub type,
+        # user name (None for any user)
+        self._triggers: dict[
+            tuple[str, str | None, str, str | None],
+            list[tuple[HassJob, dict[str, Any]]],
+        ] = {}
+        # router statistics
+        self.event_count = 0
+        self.run_count = 0
+
+    @property
+    def trigger_count(self) -> int:
+        """Return the number of attached triggers."""
+        return sum(len(triggers) for triggers in self._triggers.values())
+
+    @callback
+    def async_attach(
+        self,
+        key: tuple[str, str | None, str, str | None],
+        job: HassJob,
+        trigger_data: dict[str, Any],
+    ) -> CALLBACK_TYPE:
+        """Run a job for presence events that match the key."""
+        triggers = self._triggers.setdefault(key, [])
+        trigger = (job, trigger_data)
+        triggers.append(trigger)
+
+        @callback
+        def async_detach() -> None:
+            """Stop running the job."""
+            triggers.remove(trigger)
+            if not triggers and self._triggers.get(key) is triggers:
+                del self._triggers[key]
+
+        return async_detach
+
+    @callback
+    def async_process(self, event_data: dict[str, Any]) -> None:
+        """Run the actions of the triggers that match a presence event."""
+        self.event_count += 1
+        if not self._triggers:
+            return
+
+        presence_event = PresenceEvent(event_data)
+        sub_type = presence_event.sub_type
+        location_id = (
+            presence_event.location_id
+            if sub_type in (EVENT_PRESENCE_ENTER_LOCATION, EVENT_PRESENCE_EXIT_LOCATION)
+            else None
+        )
+        user_name = event_data["user"].get("name")
+        matches = [
+            *self._triggers.get(
+                (presence_event.sphere_id, location_id, sub_type, user_name), ()
+            ),
+            *self._triggers.get(
+                (presence_event.sphere_id, location_id, sub_type, None), ()
+            ),
+        ]
+        if not matches:
+            return
+
+        # the same data as the event that was fired on the event bus before
+        event = Event(f"{DOMAIN}_{EVENT_PRESENCE}", event_data, context=Context())
+        for job, trigger_data in matches:
+            self.run_count += 1
+            self.hass.async_run_hass_job(
+                job,
+                {
+                    "trigger": {
+                        **trigger_data,
+                        "event": event,
+                        "description": f"Crownstone presence event '{sub_type}'",
+                    }
+                },
+                event.context,
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the router."""
+        return {
+            "triggers": self.trigger_count,
+            "events": self.event_count,
+            "runs": self.run_count,
+        }
+
+
+@callback
+def async_get_trigger_router(hass: HomeAssistant) -> PresenceTriggerRouter:
+    """
+    Return the router of the integration.
+
+    The router is not kept by an entry manager, so attached triggers
+    keep working when a config entry is reloaded.
+    """
+    router: PresenceTriggerRouter | None = hass.data.get(DATA_TRIGGER_ROUTER)
+    if router is None:
+        router = hass.data[DATA_TRIGGER_ROUTER] = PresenceTriggerRouter(hass)
+    return router
@@ -0,0 +1,93 @@
+"""Bridge UART updates from the crownstone_uart reader thread to the event loop."""
+from __future__ import annotations
+
+from asyncio import TimerHandle
+from collections.abc import Callable
+import threading
+
+from crownstone_core.packets.serviceDataParsers.containers.AdvExternalCrownstoneState import (
+    AdvExternalCrownstoneState,
+)
+
+from homeassistant.core import HomeAssistant, callback
+
+
+class UartUpdateBridge:
+    """
+    Collect UART updates in a thread-safe buffer and flush them in batches.
+
+    The buffer only keeps the latest update per Crownstone,
+    a burst of advertisements costs one event loop wakeup per flush interval.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        flush_interval: float,
+        flush_callback: Callable[[list[AdvExternalCrownstoneState]], None],
+    ) -> None:
+        """Initialize the bridge."""
+        self.hass = hass
+        self.flush_interval = flush_interval
+        self.flush_callback = flush_callback
+        self._lock = threading.Lock()
+        self._buffer: dict[int, AdvExternalCrownstoneState] = {}
+        self._flush_scheduled = False
+        self._flush_handle: TimerHandle | None = None
+        self._stopped = False
+        # batch statistics
+        self.batch_count = 0
+        self.update_count = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+
+    def add(self, data: AdvExternalCrownstoneState) -> None:
+        """Add an update to the buffer. Called from the UART reader thread."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._buffer[data.crownstoneId] = data
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        self.hass.loop.call_soon_threadsafe(self._async_schedule_flush)
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        """Schedule a flush of the buffer after the flush interval."""
+        if self._stopped:
+            return
+        self._flush_handle = self.hass.loop.call_later(
+            self.flush_interval, self._async_flush
+        )
+
+    @callback
+    def _async_flush(self) -> None:
+        """Hand all buffered updates to the flush callback in one batch."""
+        self._flush_handle = None
+        with self._lock:
+            batch = list(self._buffer.values())
+            self._buffer = {}
+            self._flush_scheduled = False
+
+        if not batch:
+            return
+
+        self.batch_count += 1
+        self.update_count += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+        self.flush_callback(batch)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the bridge and drop buffered updates."""
+        with self._lock:
+            self._stopped = True
+            self._buffer = {}
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
@@ -0,0 +1,243 @@
+"""Tests for the Crownstone presence event filter."""
+from __future__ import annotations
+
+from collections.abc import Generator
+from datetime import timedelta
+import threading
+from typing import Any
+from unittest.mock import patch
+
+from crownstone_sse.const import (
+    EVENT_PRESENCE,
+    EVENT_PRESENCE_ENTER_LOCATION,
+    EVENT_PRESENCE_ENTER_SPHERE,
+    EVENT_PRESENCE_EXIT_LOCATION,
+    EVENT_PRESENCE_EXIT_SPHERE,
+)
+from crownstone_sse.events import PresenceEvent
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.crownstone.const import (
+    PRESENCE_DEDUPE_WINDOW,
+    PRESENCE_HYSTERESIS,
+)
+from custom_components.crownstone.helpers import PresenceIndex
+from custom_components.crownstone.presence_filter import PresenceEventFilter
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+SPHERE_ID = "sphere_id"
+USER_ID = "user_id"
+KITCHEN = "kitchen_id"
+LIVING_ROOM = "living_room_id"
+
+
+class FakeClock:
+    """Monotonic clock of the filter, moved by the tests."""
+
+    def __init__(self) -> None:
+        """Initialize the clock, well after the start of the monotonic clock."""
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        """Return the time."""
+        return self.now
+
+
+def presence_event(sub_type: str, location_id: str | None = None) -> PresenceEvent:
+    """Return a presence event of the user."""
+    data: dict[str, Any] = {
+        "type": EVENT_PRESENCE,
+        "subType": sub_type,
+        "sphere": {"id": SPHERE_ID, "name": "Sphere"},
+        "user": {"id": USER_ID, "name": "Crownstone User"},
+    }
+    if location_id is not None:
+        data["location"] = {"id": location_id, "name": location_id}
+    return PresenceEvent(data)
+
+
+@pytest.fixture
+def clock() -> Generator[FakeClock, None, None]:
+    """Replace the clock of the filter."""
+    fake_clock = FakeClock()
+    with patch("custom_components.crownstone.presence_filter.time", fake_clock):
+        yield fake_clock
+
+
+@pytest.fixture
+def published() -> list[tuple[str, str | None, int]]:
+    """Return the published events, with their location and thread."""
+    return []
+
+
+@pytest.fixture
+def presence_filter(
+    hass: HomeAssistant,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> PresenceEventFilter:
+    """Return a filter for a user that is not in the sphere."""
+
+    @callback
+    def publish(event_data: dict[str, Any]) -> None:
+        published.append(
+            (
+                event_data["subType"],
+                event_data.get("location", {}).get("id"),
+                threading.get_ident(),
+            )
+        )
+
+    return PresenceEventFilter(
+        hass, PresenceIndex(), PRESENCE_DEDUPE_WINDOW, PRESENCE_HYSTERESIS, publish
+    )
+
+
+def published_events(
+    published: list[tuple[str, str | None, int]]
+) -> list[tuple[str, str | None]]:
+    """Return the published events without their thread."""
+    return [(sub_type, location_id) for sub_type, location_id, _ in published]
+
+
+async def test_duplicate_events(
+    presence_filter: PresenceEventFilter,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> None:
+    """Test an identical event within the dedupe window is dropped."""
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_ENTER_SPHERE))
+    clock.now += PRESENCE_DEDUPE_WINDOW - 1
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_ENTER_SPHERE))
+    assert presence_filter.duplicate_count == 1
+
+    # after the window it is no longer a duplicate, but still stale
+    clock.now += PRESENCE_DEDUPE_WINDOW
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_ENTER_SPHERE))
+    assert presence_filter.duplicate_count == 1
+    assert presence_filter.stale_count == 1
+
+    assert published_events(published) == [(EVENT_PRESENCE_ENTER_SPHERE, None)]
+
+
+async def test_stale_events(
+    presence_filter: PresenceEventFilter,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> None:
+    """Test events that don't change the presence of the user are dropped."""
+    # not in the sphere
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_EXIT_SPHERE))
+    assert presence_filter.stale_count == 1
+
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    clock.now += PRESENCE_DEDUPE_WINDOW + 1
+    # already in the kitchen
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    assert presence_filter.stale_count == 2
+
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_EXIT_LOCATION, KITCHEN))
+    clock.now += PRESENCE_DEDUPE_WINDOW + 1
+    # already exited the kitchen
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_EXIT_LOCATION, KITCHEN))
+    assert presence_filter.stale_count == 3
+
+    assert published_events(published) == [
+        (EVENT_PRESENCE_ENTER_LOCATION, KITCHEN),
+        (EVENT_PRESENCE_EXIT_LOCATION, KITCHEN),
+    ]
+
+
+async def test_held_location_change_released(
+    hass: HomeAssistant,
+    presence_filter: PresenceEventFilter,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> None:
+    """Test a quick location change is held and released in the event loop."""
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    clock.now += 1
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, LIVING_ROOM)
+    )
+    assert presence_filter.held_count == 1
+    assert published_events(published) == [(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)]
+
+    clock.now += PRESENCE_HYSTERESIS
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=PRESENCE_HYSTERESIS)
+    )
+    await hass.async_block_till_done()
+
+    assert published_events(published) == [
+        (EVENT_PRESENCE_ENTER_LOCATION, KITCHEN),
+        (EVENT_PRESENCE_ENTER_LOCATION, LIVING_ROOM),
+    ]
+    # published from the event loop, not from an executor thread
+    assert published[1][2] == threading.get_ident()
+
+
+async def test_flip_back_drops_both_events(
+    hass: HomeAssistant,
+    presence_filter: PresenceEventFilter,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> None:
+    """Test going back to the previous location while a change is held."""
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    clock.now += 1
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, LIVING_ROOM)
+    )
+    clock.now += 1
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    assert presence_filter.flapping_count == 2
+
+    clock.now += PRESENCE_HYSTERESIS
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=PRESENCE_HYSTERESIS)
+    )
+    await hass.async_block_till_done()
+
+    assert published_events(published) == [(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)]
+
+
+async def test_exit_sphere_cancels_held_change(
+    hass: HomeAssistant,
+    presence_filter: PresenceEventFilter,
+    clock: FakeClock,
+    published: list[tuple[str, str | None, int]],
+) -> None:
+    """Test leaving the sphere drops a held location change."""
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, KITCHEN)
+    )
+    clock.now += 1
+    presence_filter.async_process(
+        presence_event(EVENT_PRESENCE_ENTER_LOCATION, LIVING_ROOM)
+    )
+    clock.now += 1
+    presence_filter.async_process(presence_event(EVENT_PRESENCE_EXIT_SPHERE))
+
+    clock.now += PRESENCE_HYSTERESIS
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=PRESENCE_HYSTERESIS)
+    )
+    await hass.async_block_till_done()
+
+    assert published_events(published) == [
+        (EVENT_PRESENCE_ENTER_LOCATION, KITCHEN),
+        (EVENT_PRESENCE_EXIT_SPHERE, None),
+    ]
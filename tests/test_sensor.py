@@ -0,0 +1,64 @@
+"""Tests for the Crownstone sensor entities."""
+from __future__ import annotations
+
+from custom_components.crownstone.const import JOULE_TO_KWH
+from custom_components.crownstone.sensor import EnergyAccumulator
+
+
+def test_energy_counter_reset() -> None:
+    """Test the total keeps increasing when the counter of a Crownstone resets."""
+    accumulator = EnergyAccumulator()
+    assert accumulator.total is None
+
+    accumulator.update(1000)
+    accumulator.update(1500)
+    assert accumulator.total == 1500
+
+    # the Crownstone rebooted
+    accumulator.update(200)
+    assert accumulator.offset == 1500
+    assert accumulator.total == 1700
+
+    accumulator.update(300)
+    assert accumulator.total == 1800
+
+
+def test_energy_legacy_restore_continued() -> None:
+    """Test a counter just below a rounded legacy state continues it."""
+    # a legacy state of 1.23 kWh, the counter was 1.2261 kWh
+    accumulator = EnergyAccumulator(baseline=int(1.23 * JOULE_TO_KWH))
+    assert accumulator.total == int(1.23 * JOULE_TO_KWH)
+
+    accumulator.update(int(1.2261 * JOULE_TO_KWH))
+    assert accumulator.offset == 0
+    assert accumulator.baseline is None
+    assert accumulator.total == int(1.2261 * JOULE_TO_KWH)
+
+    accumulator.update(int(1.24 * JOULE_TO_KWH))
+    assert accumulator.offset == 0
+    assert accumulator.total == int(1.24 * JOULE_TO_KWH)
+
+
+def test_energy_legacy_restore_reset() -> None:
+    """Test a counter far below a legacy state is counted as a reset."""
+    accumulator = EnergyAccumulator(baseline=int(1.23 * JOULE_TO_KWH))
+
+    accumulator.update(1000)
+    assert accumulator.offset == int(1.23 * JOULE_TO_KWH)
+    assert accumulator.total == int(1.23 * JOULE_TO_KWH) + 1000
+
+
+def test_energy_accumulator_restore() -> None:
+    """Test the accumulator is restored from its stored data."""
+    stored = EnergyAccumulator(offset=1500, last_counter=300).as_dict()
+    accumulator = EnergyAccumulator.from_dict(stored)
+    assert accumulator is not None
+    assert accumulator.total == 1800
+
+    # a baseline that did not get a reading yet is kept over a restart
+    stored = EnergyAccumulator(baseline=5000).as_dict()
+    accumulator = EnergyAccumulator.from_dict(stored)
+    assert accumulator is not None
+    assert accumulator.total == 5000
+
+    assert EnergyAccumulator.from_dict({"offset": "invalid"}) is None
@@ -0,0 +1,146 @@
+"""Tests for the Crownstone presence trigger router."""
+from __future__ import annotations
+
+from typing import Any
+
+from crownstone_sse.const import (
+    EVENT_PRESENCE,
+    EVENT_PRESENCE_ENTER_LOCATION,
+    EVENT_PRESENCE_ENTER_SPHERE,
+    EVENT_PRESENCE_EXIT_LOCATION,
+)
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.crownstone.const import DOMAIN
+from custom_components.crownstone.entry_manager import CrownstoneEntryManager
+from custom_components.crownstone.trigger_router import async_get_trigger_router
+from homeassistant.core import HassJob, HomeAssistant, callback
+
+SPHERE_ID = "sphere_id"
+USER_NAME = "Crownstone User"
+OTHER_USER_NAME = "Other User"
+KITCHEN = "kitchen_id"
+LIVING_ROOM = "living_room_id"
+
+
+def presence_event_data(
+    user_name: str = USER_NAME,
+    sub_type: str = EVENT_PRESENCE_ENTER_SPHERE,
+    location_id: str | None = None,
+) -> dict[str, Any]:
+    """Return the data of a presence event, a sphere enter event by default."""
+    event_data: dict[str, Any] = {
+        "type": EVENT_PRESENCE,
+        "subType": sub_type,
+        "sphere": {"id": SPHERE_ID, "name": "Sphere"},
+        "user": {"id": user_name.lower(), "name": user_name},
+    }
+    if location_id is not None:
+        event_data["location"] = {"id": location_id, "name": location_id}
+    return event_data
+
+
+def attach_triggers(
+    hass: HomeAssistant, keys: list[tuple[str, str | None, str, str | None]]
+) -> dict[tuple[str, str | None, str, str | None], int]:
+    """Attach a trigger for each key, return the number of runs per key."""
+    runs = dict.fromkeys(keys, 0)
+    for key in keys:
+
+        @callback
+        def action(
+            run_variables: dict[str, Any],
+            context: Any = None,
+            key: tuple[str, str | None, str, str | None] = key,
+        ) -> None:
+            runs[key] += 1
+
+        async_get_trigger_router(hass).async_attach(
+            key, HassJob(action), {"id": "0", "idx": "0"}
+        )
+    return runs
+
+
+async def test_location_and_sphere_triggers(hass: HomeAssistant) -> None:
+    """Test location events only run triggers of their location."""
+    kitchen = (SPHERE_ID, KITCHEN, EVENT_PRESENCE_ENTER_LOCATION, None)
+    living_room = (SPHERE_ID, LIVING_ROOM, EVENT_PRESENCE_ENTER_LOCATION, None)
+    kitchen_exit = (SPHERE_ID, KITCHEN, EVENT_PRESENCE_EXIT_LOCATION, None)
+    sphere = (SPHERE_ID, None, EVENT_PRESENCE_ENTER_SPHERE, None)
+    runs = attach_triggers(hass, [kitchen, living_room, kitchen_exit, sphere])
+
+    router = async_get_trigger_router(hass)
+    router.async_process(
+        presence_event_data(sub_type=EVENT_PRESENCE_ENTER_LOCATION, location_id=KITCHEN)
+    )
+    await hass.async_block_till_done()
+    assert runs == {kitchen: 1, living_room: 0, kitchen_exit: 0, sphere: 0}
+
+    router.async_process(presence_event_data())
+    await hass.async_block_till_done()
+    assert runs == {kitchen: 1, living_room: 0, kitchen_exit: 0, sphere: 1}
+
+
+async def test_exit_does_not_run_enter_triggers(hass: HomeAssistant) -> None:
+    """Test an exit event doesn't run the enter triggers of its location."""
+    enter = (SPHERE_ID, KITCHEN, EVENT_PRESENCE_ENTER_LOCATION, USER_NAME)
+    exit_ = (SPHERE_ID, KITCHEN, EVENT_PRESENCE_EXIT_LOCATION, USER_NAME)
+    runs = attach_triggers(hass, [enter, exit_])
+
+    async_get_trigger_router(hass).async_process(
+        presence_event_data(sub_type=EVENT_PRESENCE_EXIT_LOCATION, location_id=KITCHEN)
+    )
+    await hass.async_block_till_done()
+    assert runs == {enter: 0, exit_: 1}
+
+
+async def test_user_and_any_user_triggers(hass: HomeAssistant) -> None:
+    """Test the triggers of a user and of any user both run for the user."""
+    user = (SPHERE_ID, None, EVENT_PRESENCE_ENTER_SPHERE, USER_NAME)
+    any_user = (SPHERE_ID, None, EVENT_PRESENCE_ENTER_SPHERE, None)
+    runs = attach_triggers(hass, [user, any_user])
+
+    router = async_get_trigger_router(hass)
+    router.async_process(presence_event_data())
+    await hass.async_block_till_done()
+    assert runs == {user: 1, any_user: 1}
+
+    router.async_process(presence_event_data(OTHER_USER_NAME))
+    await hass.async_block_till_done()
+    assert runs == {user: 1, any_user: 2}
+    assert router.run_count == 3
+
+
+async def test_triggers_survive_entry_reload(hass: HomeAssistant) -> None:
+    """Test a trigger attached before a reload runs for events after it."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data={}, options={})
+    config_entry.add_to_hass(hass)
+    calls: list[dict[str, Any]] = []
+
+    @callback
+    def action(run_variables: dict[str, Any], context: Any = None) -> None:
+        calls.append(run_variables)
+
+    manager = CrownstoneEntryManager(hass, config_entry)
+    detach = async_get_trigger_router(hass).async_attach(
+        (SPHERE_ID, None, EVENT_PRESENCE_ENTER_SPHERE, USER_NAME),
+        HassJob(action),
+        {"id": "0", "idx": "0"},
+    )
+
+    # a reload replaces the manager, the automation keeps its trigger
+    reloaded_manager = CrownstoneEntryManager(hass, config_entry)
+    assert reloaded_manager.trigger_router is manager.trigger_router
+    assert reloaded_manager.trigger_router.trigger_count == 1
+
+    reloaded_manager.trigger_router.async_process(presence_event_data())
+    reloaded_manager.trigger_router.async_process(presence_event_data(OTHER_USER_NAME))
+    await hass.async_block_till_done()
+    assert len(calls) == 1
+    assert calls[0]["trigger"]["event"].data["user"]["name"] == USER_NAME
+
+    detach()
+    assert reloaded_manager.trigger_router.trigger_count == 0
+    reloaded_manager.trigger_router.async_process(presence_event_data())
+    await hass.async_block_till_done()
+    assert len(calls) == 1